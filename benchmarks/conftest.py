@@ -0,0 +1,86 @@
+"""Synthetic game libraries for the benchmarks.
+
+python -m pytest benchmarks
+
+Every run is saved as json under .benchmarks, compare runs with
+--benchmark-compare. The move benchmarks need a dir on another drive,
+/dev/shm unless GAME_LINKER_BENCH_OTHER_DRIVE names one.
+"""
+import os
+import sys
+
+import pytest
+import yaml
+from pytest_benchmark.utils import get_tag
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game_linker.config import GameLinkerConfig  # noqa: E402
+
+PLATFORM_COUNT = 10
+GAMES_PER_LOCATION = 300
+# (count, size) of the files in the game tree, from shader cache to archives
+GAME_FILES = [
+    (2000, 4 * 1024),
+    (200, 256 * 1024),
+    (4, 16 * 1024 * 1024),
+]
+SUB_DIRS = 50
+
+
+def pytest_configure(config):
+    if not config.option.benchmark_json and not config.option.benchmark_save:
+        # same as --benchmark-autosave, named after the commit
+        config.option.benchmark_autosave = get_tag()
+
+
+@pytest.fixture(scope="session")
+def library(tmp_path_factory) -> str:
+    """A config with many platforms, each with hundreds of games in two locations.
+
+    Returns the path of the config file.
+    """
+    root = tmp_path_factory.mktemp("library")
+    platforms = {}
+    for p in range(PLATFORM_COUNT):
+        platform = f"platform{p}"
+        dirs = {}
+        for location in ["hdd", "ssd"]:
+            location_dir = root / location / platform
+            for g in range(GAMES_PER_LOCATION):
+                game = location_dir / f"{location} game {g:04}"
+                game.mkdir(parents=True)
+                (game / "game.exe").write_bytes(b"x" * g)
+            dirs[location] = str(location_dir)
+        platforms[platform] = {"dirs": dirs, "ignore": ["Deleted"]}
+    config_path = root / "config.yaml"
+    config_path.write_text(yaml.dump(platforms))
+    return str(config_path)
+
+
+@pytest.fixture
+def make_config(library):
+    def make_config(*args: str) -> GameLinkerConfig:
+        return GameLinkerConfig(["-c", library, *args])
+
+    return make_config
+
+
+@pytest.fixture(scope="session")
+def game_tree(tmp_path_factory) -> str:
+    """A game folder with a mix of many small files and a few large ones."""
+    game = tmp_path_factory.mktemp("src") / "game"
+    n = 0
+    for count, size in GAME_FILES:
+        data = os.urandom(size)
+        for _ in range(count):
+            sub_dir = game / f"{n % SUB_DIRS:02}"
+            sub_dir.mkdir(parents=True, exist_ok=True)
+            (sub_dir / f"{n}.bin").write_bytes(data)
+            n += 1
+    return str(game)
+
+
+@pytest.fixture(scope="session")
+def game_tree_size() -> int:
+    return sum(count * size for count, size in GAME_FILES)
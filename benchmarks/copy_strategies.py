@@ -0,0 +1,77 @@
+"""Compares the copy strategies of the copy engine, and shutil.copytree, on large
+and small files.
+
+python benchmarks/copy_strategies.py [directory]
+
+The files are created in directory (a temp dir by default), so point it at the
+drive to measure. Strategies the filesystem does not support are skipped.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game_linker.copy_engine import CopyEngine  # noqa: E402
+from game_linker.fast_copy import COPY_STRATEGIES  # noqa: E402
+from game_linker.util import format_size  # noqa: E402
+
+LARGE_FILE_SIZE = 512 * 1024 * 1024
+SMALL_FILE_SIZE = 16 * 1024
+SMALL_FILE_COUNT = 5000
+
+
+def _make_tree(root: str, count: int, size: int):
+    os.makedirs(root)
+    data = os.urandom(size)
+    for n in range(count):
+        sub_dir = os.path.join(root, f"{n % 50:02}")
+        os.makedirs(sub_dir, exist_ok=True)
+        with open(os.path.join(sub_dir, f"{n}.bin"), "wb") as f:
+            f.write(data)
+
+
+def _bench(src: str, dst: str, strategy: str, count: int, size: int):
+    start = time.perf_counter()
+    try:
+        if strategy == "shutil":
+            shutil.copytree(src, dst)
+        else:
+            CopyEngine(src, dst, strategy=strategy).copy()
+    except shutil.Error as e:
+        # only show the first file that failed
+        print(f"  {strategy:<16} skipped ({e.args[0][0][2]})")
+        return
+    except OSError as e:
+        print(f"  {strategy:<16} skipped ({e})")
+        return
+    finally:
+        seconds = time.perf_counter() - start
+        shutil.rmtree(dst, ignore_errors=True)
+    print(
+        f"  {strategy:<16} {format_size(count * size / seconds)}/s"
+        f" {count / seconds:>10.0f} files/s"
+    )
+
+
+def main():
+    root = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        for label, count, size in [
+            ("large file", 1, LARGE_FILE_SIZE),
+            ("small files", SMALL_FILE_COUNT, SMALL_FILE_SIZE),
+        ]:
+            src = os.path.join(root, "src")
+            _make_tree(src, count, size)
+            print(f"{label}: {count} x {format_size(size)}")
+            for strategy in ["shutil"] + COPY_STRATEGIES:
+                _bench(src, os.path.join(root, "dst"), strategy, count, size)
+            shutil.rmtree(src)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
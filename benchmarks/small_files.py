@@ -0,0 +1,75 @@
+"""Compares copying a tree of many small files with and without small file batching.
+
+python benchmarks/small_files.py [directory]
+
+The tree looks like a shader cache: thousands of tiny files spread over a few
+hundred dirs, plus a handful of large archives. It is created in directory (a
+temp dir by default), so point it at the drive to measure.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game_linker.copy_engine import CopyEngine  # noqa: E402
+from game_linker.copy_engine import DEFAULT_SMALL_FILE_SIZE  # noqa: E402
+from game_linker.util import format_size  # noqa: E402
+
+SMALL_FILE_SIZE = 4 * 1024
+SMALL_FILE_COUNT = 20000
+DIR_COUNT = 200
+LARGE_FILE_SIZE = 64 * 1024 * 1024
+LARGE_FILE_COUNT = 4
+RUNS = 3
+
+
+def _make_tree(root: str):
+    small = os.urandom(SMALL_FILE_SIZE)
+    for n in range(SMALL_FILE_COUNT):
+        sub_dir = os.path.join(root, "cache", f"{n % DIR_COUNT:03}")
+        os.makedirs(sub_dir, exist_ok=True)
+        with open(os.path.join(sub_dir, f"{n}.bin"), "wb") as f:
+            f.write(small)
+    large = os.urandom(LARGE_FILE_SIZE)
+    for n in range(LARGE_FILE_COUNT):
+        with open(os.path.join(root, f"data{n}.pak"), "wb") as f:
+            f.write(large)
+
+
+def _bench(src: str, dst: str, label: str, small_file_size: int):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        CopyEngine(src, dst, small_file_size=small_file_size).copy()
+        seconds = time.perf_counter() - start
+        shutil.rmtree(dst)
+        best = seconds if best is None else min(best, seconds)
+    count = SMALL_FILE_COUNT + LARGE_FILE_COUNT
+    size = SMALL_FILE_COUNT * SMALL_FILE_SIZE + LARGE_FILE_COUNT * LARGE_FILE_SIZE
+    print(
+        f"  {label:<12} {count / best:>10.0f} files/s"
+        f" {format_size(size / best)}/s (best of {RUNS})"
+    )
+
+
+def main():
+    root = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        src = os.path.join(root, "src")
+        _make_tree(src)
+        print(
+            f"{SMALL_FILE_COUNT} x {format_size(SMALL_FILE_SIZE)}"
+            f" + {LARGE_FILE_COUNT} x {format_size(LARGE_FILE_SIZE)}"
+        )
+        dst = os.path.join(root, "dst")
+        _bench(src, dst, "per file", 0)
+        _bench(src, dst, "batched", DEFAULT_SMALL_FILE_SIZE)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
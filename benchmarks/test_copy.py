@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from game_linker.copy_progress import CopyProgress
+
+ROUNDS = 3
+# a dir on another drive, so a move copies instead of renaming
+OTHER_DRIVE = os.environ.get("GAME_LINKER_BENCH_OTHER_DRIVE", "/dev/shm")
+
+
+@pytest.fixture
+def dst(tmp_path) -> str:
+    return str(tmp_path / "dst" / "game")
+
+
+@pytest.fixture
+def other_drive_dst(tmp_path):
+    if not os.path.isdir(OTHER_DRIVE):
+        pytest.skip(f"{OTHER_DRIVE} does not exist")
+    if os.stat(OTHER_DRIVE).st_dev == os.stat(tmp_path).st_dev:
+        pytest.skip(f"{OTHER_DRIVE} is on the same drive as {tmp_path}")
+    root = tempfile.mkdtemp(dir=OTHER_DRIVE)
+    yield os.path.join(root, "game")
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def _add_throughput(benchmark, size: int):
+    # there are no stats with --benchmark-disable
+    if benchmark.enabled:
+        benchmark.extra_info["bytes_per_second"] = size / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("workers", [0, 4], ids=["shutil", "engine"])
+def test_copy(benchmark, game_tree, game_tree_size, dst, workers):
+    def setup():
+        shutil.rmtree(dst, ignore_errors=True)
+
+    benchmark.extra_info["bytes"] = game_tree_size
+    benchmark.pedantic(
+        CopyProgress.copy,
+        args=(game_tree, dst),
+        kwargs={"workers": workers},
+        setup=setup,
+        rounds=ROUNDS,
+    )
+    _add_throughput(benchmark, game_tree_size)
+    assert os.path.isdir(dst)
+
+
+@pytest.mark.parametrize("workers", [0, 4], ids=["shutil", "engine"])
+def test_move(benchmark, game_tree, game_tree_size, tmp_path, other_drive_dst, workers):
+    # on one drive shutil would only rename, so dst is on another one
+    src = str(tmp_path / "src" / "game")
+    dst = other_drive_dst
+
+    def setup():
+        shutil.rmtree(dst, ignore_errors=True)
+        shutil.rmtree(src, ignore_errors=True)
+        shutil.copytree(game_tree, src)
+
+    benchmark.extra_info["bytes"] = game_tree_size
+    benchmark.pedantic(
+        CopyProgress.move,
+        args=(src, dst),
+        kwargs={"workers": workers},
+        setup=setup,
+        rounds=ROUNDS,
+    )
+    _add_throughput(benchmark, game_tree_size)
+    assert not os.path.exists(src)
@@ -0,0 +1,53 @@
+import builtins
+
+import pytest
+
+from game_linker.copy_progress import CopyProgress
+from game_linker.search import GameSearch
+
+SEARCH_GAMES = 30000
+
+
+@pytest.mark.parametrize("index", [False, True], ids=["scandir", "index"])
+def test_get_games(benchmark, make_config, index):
+    config = make_config("-p", "platform0", *([] if index else ["--no-index"]))
+    games = benchmark(config.get_games, "platform0")
+    assert len(games) == 600
+
+
+@pytest.mark.parametrize("index", [False, True], ids=["scandir", "index"])
+def test_prompt_for_all_games(benchmark, make_config, monkeypatch, capsys, index):
+    config = make_config("-l", *([] if index else ["--no-index"]))
+    monkeypatch.setattr(builtins, "input", lambda prompt: "1")
+    platform, game = benchmark(config._prompt_for_all_games)
+    assert platform == "platform0"
+    assert game == "hdd game 0000"
+
+
+def test_build_bar(benchmark, game_tree, game_tree_size, tmp_path):
+    def build_bar():
+        p = CopyProgress(game_tree, str(tmp_path / "dst"))
+        p.bar.close()
+        return p
+
+    p = benchmark(build_bar)
+    assert p.manifest.total_size == game_tree_size
+
+
+@pytest.fixture(scope="module")
+def game_names():
+    words = ["dead", "space", "red", "redemption", "witcher", "hunt", "fantasy"]
+    return [
+        f"{words[n % 7].title()} {words[n // 7 % 7]} {n}" for n in range(SEARCH_GAMES)
+    ]
+
+
+def test_search_index(benchmark, game_names):
+    search = benchmark(GameSearch, game_names)
+    assert len(search.entries) == SEARCH_GAMES
+
+
+@pytest.mark.parametrize("query", ["rdr2", "witcher", "wticher hnt"])
+def test_search(benchmark, game_names, query):
+    search = GameSearch(game_names)
+    benchmark(search.search, query)
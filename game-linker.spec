@@ -7,7 +7,7 @@ data_files = [
     ('README.md', '.'),
     ('config.yaml', '.'),
 ]
-a = Analysis(['game_linker\\linker.py'],
+a = Analysis(['game_linker\\__main__.py'],
              pathex=['D:\\dev\\python\\game-linker'],
              binaries=[],
              datas=data_files,
@@ -0,0 +1,4 @@
+from game_linker.cli import main
+
+if __name__ == "__main__":
+    main()
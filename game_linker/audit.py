@@ -0,0 +1,206 @@
+import functools
+import os
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from game_linker.config import GameLinkerConfig
+from game_linker.journal import Journal
+from game_linker.scanner import run_concurrently
+from game_linker.util import create_link
+from game_linker.util import is_link_stat
+from game_linker.util import read_link
+from game_linker.util import remove_link
+
+# the source has a link to the copy in the target
+LINKED = "linked"
+# the game is only in the source
+UNLINKED = "unlinked"
+# the source has a link, but what it points to is gone
+DANGLING = "dangling"
+# the source has a link to a folder that is not the copy in the target
+MISDIRECTED = "misdirected"
+# the game is in both locations, neither is a link
+DUPLICATED = "duplicated"
+# the game is only in the target, without a link in the source
+ORPHANED = "orphaned"
+LINK_STATES = [LINKED, UNLINKED, DANGLING, MISDIRECTED, DUPLICATED, ORPHANED]
+PROBLEM_STATES = [DANGLING, MISDIRECTED, DUPLICATED, ORPHANED]
+REPAIRABLE_STATES = [DANGLING, MISDIRECTED, ORPHANED]
+
+
+class GameEntry(NamedTuple):
+    name: str
+    path: str
+    is_link: bool
+    # for links, whether what it points to is gone
+    broken: bool = False
+
+
+class LinkStatus(NamedTuple):
+    platform: str
+    name: str
+    state: str
+    source_path: str
+    target_path: str
+    # where the link in the source points to
+    link_target: Optional[str] = None
+    # a duplicate left by a move that did not finish, linking resumes it
+    interrupted: bool = False
+
+
+def _is_link(entry: os.DirEntry) -> bool:
+    # linux lists the type with the name, windows the reparse point attribute
+    if entry.is_symlink():
+        return True
+    return os.name == "nt" and is_link_stat(entry.stat(follow_symlinks=False))
+
+
+def scan_location(directory: str, ignore_dirs: FrozenSet[str]) -> Dict[str, GameEntry]:
+    """The game folders and links in the directory, by lowercase name.
+
+    Only what the listing already knows is used, plus a stat for every link to
+    see if it dangles, so thousands of games are checked in well under a second.
+    """
+    games = {}
+    try:
+        it = os.scandir(directory)
+    except FileNotFoundError:
+        return games
+    with it:
+        for entry in it:
+            if entry.name.lower() in ignore_dirs:
+                continue
+            if _is_link(entry):
+                broken = not os.path.exists(entry.path)
+                games[entry.name.lower()] = GameEntry(
+                    entry.name, entry.path, True, broken
+                )
+            elif entry.is_dir(follow_symlinks=False):
+                games[entry.name.lower()] = GameEntry(entry.name, entry.path, False)
+    return games
+
+
+def _same_path(path1: str, path2: str) -> bool:
+    if os.path.normcase(path1) == os.path.normcase(os.path.normpath(path2)):
+        return True
+    # e.g. the target location is itself reached through a link
+    return os.path.realpath(path1) == os.path.realpath(path2)
+
+
+def classify(
+    source: Optional[GameEntry],
+    target: Optional[GameEntry],
+    link_target: Optional[str] = None,
+    target_path: Optional[str] = None,
+) -> str:
+    """The state of a game, a link in the source should point to target_path."""
+    if source is not None and source.is_link:
+        if source.broken:
+            return DANGLING
+        if link_target is not None and target_path is not None:
+            if not _same_path(link_target, target_path):
+                return MISDIRECTED
+        return LINKED
+    has_copy = target is not None and not target.is_link
+    if source is not None:
+        return DUPLICATED if has_copy else UNLINKED
+    # links in the target are not games of the target
+    return ORPHANED if has_copy else UNLINKED
+
+
+def repair(status: LinkStatus) -> str:
+    """Fixes a dangling, misdirected or orphaned game, returns what was done."""
+    if status.state == MISDIRECTED and not os.path.isdir(status.target_path):
+        # the link is the only way to the game, so it is kept
+        return f"left alone, the game is only in {status.link_target}"
+    if status.state in [DANGLING, MISDIRECTED]:
+        remove_link(status.source_path)
+        if not os.path.isdir(status.target_path):
+            return "removed the dangling link"
+        create_link(status.target_path, status.source_path)
+        return "linked again"
+    if status.state == ORPHANED:
+        create_link(status.target_path, status.source_path)
+        return "linked"
+    raise ValueError(f"{status.state} games cannot be repaired")
+
+
+class LinkAuditor:
+    """Checks the links between the source and target location of each platform.
+
+    Every location of every platform is listed at once, so a slow drive only
+    holds up its own platforms, and one that does not respond is skipped.
+    """
+
+    def __init__(self, config: GameLinkerConfig):
+        self.config = config
+
+    def _statuses(
+        self,
+        platform: str,
+        sources: Dict[str, GameEntry],
+        targets: Dict[str, GameEntry],
+    ) -> List[LinkStatus]:
+        source_dir = self.config.get_platform_dir(platform, self.config.source)
+        target_dir = self.config.get_platform_dir(platform, self.config.target)
+        statuses = []
+        for key in set(sources).union(targets):
+            source = sources.get(key)
+            target = targets.get(key)
+            name = (source or target).name
+            target_path = os.path.join(target_dir, target.name if target else name)
+            link_target = None
+            if source is not None and source.is_link:
+                link_target = read_link(source.path)
+            state = classify(source, target, link_target, target_path)
+            if state == UNLINKED and source is None:
+                # only a link in the target, nothing to do with this platform
+                continue
+            interrupted = state == DUPLICATED and os.path.exists(
+                Journal.path_for(target_path)
+            )
+            statuses.append(
+                LinkStatus(
+                    platform,
+                    name,
+                    state,
+                    os.path.join(source_dir, name),
+                    target_path,
+                    link_target,
+                    interrupted,
+                )
+            )
+        return statuses
+
+    def audit(self, platforms: List[str]) -> List[LinkStatus]:
+        jobs = {}
+        for platform in platforms:
+            error = self.config.get_platform_error(platform)
+            if error:
+                print(f"Skipping {platform} ({error})")
+                continue
+            ignore_dirs = self.config.get_ignore_dirs_for_platform(platform)
+            for location in [self.config.source, self.config.target]:
+                directory = self.config.get_platform_dir(platform, location)
+                jobs[(platform, location)] = functools.partial(
+                    scan_location, directory, ignore_dirs
+                )
+        results, errors = run_concurrently(jobs, self.config.scan_timeout)
+        skipped = set()
+        for (platform, location), error in errors.items():
+            skipped.add(platform)
+            print(f"Skipping {platform} ({location}: {error})")
+        statuses = []
+        for platform in platforms:
+            source_key = (platform, self.config.source)
+            target_key = (platform, self.config.target)
+            if platform in skipped or source_key not in results:
+                continue
+            statuses.extend(
+                self._statuses(platform, results[source_key], results[target_key])
+            )
+        statuses.sort(key=lambda s: (s.platform.lower(), s.name.lower()))
+        return statuses
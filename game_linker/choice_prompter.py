@@ -1,18 +1,111 @@
 import sys
+from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Sized
 from typing import Union
 
+from game_linker.search import normalize_words
+
+DEFAULT_DISPLAY_COUNT = 10
+
+
+class LazyChoices:
+    """The choices, pulled from the source only once a page needs them.
+
+    A list is used as it is, any other iterable is read as far as needed, so a
+    generator can still be scanning drives while the first page is shown.
+    """
+
+    def __init__(self, source: Iterable[str]):
+        self._keys: Dict[int, str] = {}
+        if isinstance(source, list):
+            self._items = source
+            self._source = iter(())
+            self.exhausted = True
+        else:
+            self._items = []
+            self._source = iter(source)
+            self.exhausted = False
+
+    def load(self, count: int) -> int:
+        """Pulls choices until there are count of them, returns how many there are."""
+        while len(self._items) < count and not self.exhausted:
+            try:
+                self._items.append(next(self._source))
+            except StopIteration:
+                self.exhausted = True
+        return len(self._items)
+
+    def __getitem__(self, index: int) -> str:
+        return self._items[index]
+
+    def key(self, index: int) -> str:
+        key = self._keys.get(index)
+        if key is None:
+            key = self._keys[index] = "".join(normalize_words(self._items[index]))
+        return key
+
+    def filter(self, text: str) -> "FilteredChoices":
+        return FilteredChoices(self, text)
+
+
+class FilteredChoices:
+    """The choices of a parent that contain the text, found as they are needed.
+
+    Only the positions of the matches are kept, so filtering again narrows the
+    list further without copying it.
+    """
+
+    def __init__(self, parent: Union[LazyChoices, "FilteredChoices"], text: str):
+        self.parent = parent
+        self.text = "".join(normalize_words(text))
+        self._indexes: List[int] = []
+        # the next choice of the parent to check
+        self._next = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.parent.exhausted and self._next >= self.parent.load(self._next)
+
+    def load(self, count: int) -> int:
+        while len(self._indexes) < count:
+            if self.parent.load(self._next + 1) <= self._next:
+                break
+            if self.text in self.parent.key(self._next):
+                self._indexes.append(self._next)
+            self._next += 1
+        return len(self._indexes)
+
+    def __getitem__(self, index: int) -> str:
+        return self.parent[self._indexes[index]]
+
+    def key(self, index: int) -> str:
+        return self.parent.key(self._indexes[index])
+
+    def filter(self, text: str) -> "FilteredChoices":
+        return FilteredChoices(self, text)
+
 
 class ChoicePrompter:
     def __init__(
-        self, prompt: str, choices: List[str], display_count: Optional[int] = None
+        self,
+        prompt: str,
+        choices: Iterable[str],
+        display_count: Optional[int] = None,
+        describe: Optional[Callable[[str], str]] = None,
     ):
-        if not choices:
-            raise ValueError("No choices given.")
+        if isinstance(choices, Sized):
+            if not choices:
+                raise ValueError("No choices given.")
+            display_count = display_count or len(choices)
         self.prompt = prompt
-        self.choices = choices
-        self.display_count = display_count or len(self.choices)
+        self.choices = LazyChoices(choices)
+        self.display_count = display_count or DEFAULT_DISPLAY_COUNT
+        # only the choices on the page are described, e.g. with their size
+        self.describe = describe or str
 
     def _get_padded_option(
         self, option: Union[int, str], description: str, pad: int
@@ -20,42 +113,63 @@ class ChoicePrompter:
         return f"{option:>{pad}}: {description}"
 
     def choose(self):
-        if len(self.choices) == 1:
+        loaded = self.choices.load(2)
+        if loaded == 0:
+            raise ValueError("No choices given.")
+        if loaded == 1:
             option = self.choices[0]
             print(f"Only one option available. Choosing {option}")
             return option
+        view = self.choices
         lower_game_index = 1
-        choice = None
-        while not choice:
+        while True:
             upper_game_index = min(
-                lower_game_index + self.display_count - 1, len(self.choices)
+                lower_game_index + self.display_count - 1,
+                view.load(lower_game_index + self.display_count - 1),
             )
             pad = len(str(upper_game_index))
-            valid_options = [str(n) for n in range(1, upper_game_index + 1)]
-            for game_index, game in enumerate(
-                self.choices[lower_game_index - 1 : upper_game_index],
-                start=lower_game_index,
-            ):
-                print(self._get_padded_option(game_index, game, pad))
-            if lower_game_index > 1:
-                valid_options.append("<")
+            for game_index in range(lower_game_index, upper_game_index + 1):
+                description = self.describe(view[game_index - 1])
+                print(self._get_padded_option(game_index, description, pad))
+            has_previous = lower_game_index > 1
+            if has_previous:
                 print(self._get_padded_option("<", "Previous", pad))
-            if upper_game_index < len(self.choices):
-                valid_options.append(">")
+            # a lazy source might have more, without waiting for it to find out
+            has_next = view.load(upper_game_index) > upper_game_index or (
+                not view.exhausted
+            )
+            if has_next:
                 print(self._get_padded_option(">", "Next", pad))
-            valid_options.append("q")
+            if view is not self.choices:
+                print(self._get_padded_option("*", "Show all", pad))
             print(self._get_padded_option("q", "Exit", pad))
-            choice = None
+            print("Type anything else to filter the list")
             while True:
-                option = input(self.prompt)
-                option = option.strip().lower()
-                if option in valid_options:
-                    if option == "q":
-                        sys.exit("Exiting...")
-                    elif option == "<":
-                        lower_game_index -= self.display_count
-                    elif option == ">":
+                option = input(self.prompt).strip()
+                lower_option = option.lower()
+                if lower_option == "q":
+                    sys.exit("Exiting...")
+                elif lower_option == "<" and has_previous:
+                    lower_game_index -= self.display_count
+                    break
+                elif lower_option == ">" and has_next:
+                    if view.load(upper_game_index + 1) > upper_game_index:
                         lower_game_index += self.display_count
-                    else:
-                        return self.choices[int(option) - 1]
+                        break
+                    has_next = False
+                    print("There are no more options")
+                elif lower_option == "*" and view is not self.choices:
+                    view = self.choices
+                    lower_game_index = 1
                     break
+                elif option.isdigit():
+                    # any option shown so far can be chosen
+                    if 1 <= int(option) <= upper_game_index:
+                        return view[int(option) - 1]
+                elif option:
+                    filtered = view.filter(option)
+                    if filtered.load(1):
+                        view = filtered
+                        lower_game_index = 1
+                        break
+                    print(f'Nothing matches "{option}"')
@@ -0,0 +1,55 @@
+"""The game-linker command.
+
+Heavy modules are only imported by the commands that need them, tqdm once a
+copy starts and yaml once the compiled config is out of date, so listing games
+or exiting at a prompt starts quickly.
+"""
+from typing import List
+from typing import Optional
+
+from game_linker.config import GameLinkerConfig
+from game_linker.linker import audit_links
+from game_linker.linker import GameLinker
+from game_linker.linker import link_batch
+from game_linker.linker import list_games
+from game_linker.linker import plan_tiering
+
+
+def main(argv: Optional[List[str]] = None):
+    config = GameLinkerConfig(argv)
+    if config.serve:
+        from game_linker.daemon import serve
+
+        serve(config)
+    elif (
+        config.show_jobs
+        or config.tail_job is not None
+        or config.queue
+        or config.set_throttle
+    ):
+        from game_linker import client
+
+        daemon = client.DaemonClient(config.daemon_port)
+        if config.set_throttle:
+            print(f"Copying with {daemon.throttle(*config.new_limits)}")
+        elif config.show_jobs:
+            client.list_jobs(daemon)
+        elif config.tail_job is not None:
+            client.tail_job(daemon, config.tail_job)
+        else:
+            linker = GameLinker(config)
+            linker.prepare()
+            client.queue_link(
+                daemon, linker.platform, linker.game, linker.reverse, config.queue_at
+            )
+    elif config.list_games:
+        list_games(config)
+    elif config.audit:
+        audit_links(config)
+    elif config.plan:
+        plan_tiering(config)
+    elif config.batch:
+        link_batch(config)
+    else:
+        linker = GameLinker(config)
+        linker.link()
@@ -0,0 +1,135 @@
+import datetime
+import json
+import socket
+import sys
+import time
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+
+# the daemon only listens on the loopback, it trusts any local client
+HOST = "127.0.0.1"
+DEFAULT_PORT = 47653
+
+
+def next_time_of_day(hour: int, minute: int, now: Optional[float] = None) -> float:
+    """The timestamp of the next time the clock shows hour:minute."""
+    now = time.time() if now is None else now
+    today = datetime.datetime.fromtimestamp(now)
+    at = today.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if at.timestamp() <= now:
+        at += datetime.timedelta(days=1)
+    return at.timestamp()
+
+
+class DaemonClient:
+    """Sends requests to the --serve process, one connection per request.
+
+    Requests and responses are json lines, a request can be answered by several
+    responses, e.g. the output of a job as it is tailed.
+    """
+
+    def __init__(self, port: Optional[int] = None):
+        self.port = port or DEFAULT_PORT
+
+    def _request(self, request: dict) -> Iterator[dict]:
+        try:
+            sock = socket.create_connection((HOST, self.port))
+        except ConnectionRefusedError:
+            sys.exit("game-linker is not running with --serve")
+        with sock, sock.makefile("r", encoding="utf-8") as f:
+            sock.sendall(f"{json.dumps(request)}\n".encode("utf-8"))
+            for line in f:
+                response = json.loads(line)
+                if "error" in response:
+                    sys.exit(response["error"])
+                yield response
+
+    def queue(
+        self,
+        platform: str,
+        game: str,
+        reverse: bool,
+        at: Optional[Tuple[int, int]] = None,
+    ) -> dict:
+        request = {
+            "command": "link",
+            "platform": platform,
+            "game": game,
+            "reverse": reverse,
+            "not_before": next_time_of_day(*at) if at is not None else 0,
+        }
+        (response,) = self._request(request)
+        return response["job"]
+
+    def jobs(self) -> list:
+        (response,) = self._request({"command": "jobs"})
+        return response["jobs"]
+
+    def throttle(
+        self,
+        bytes_per_second: Optional[float] = None,
+        files_per_second: Optional[float] = None,
+    ) -> str:
+        """Changes the limits of every copy of the daemon, None keeps a limit."""
+        (response,) = self._request(
+            {
+                "command": "throttle",
+                "bytes_per_second": bytes_per_second,
+                "files_per_second": files_per_second,
+            }
+        )
+        return response["throttle"]
+
+    def tail(self, job_id: int) -> dict:
+        """Shows the output of the job until it is done, returns the finished job."""
+        job = {}
+        for response in self._request({"command": "tail", "job": job_id}):
+            if "output" in response:
+                sys.stderr.write(response["output"])
+                sys.stderr.flush()
+            else:
+                job = response["job"]
+        return job
+
+
+def format_job(job: dict) -> str:
+    action = "unlink" if job["reverse"] else "link"
+    line = f"{job['id']}: {action} [{job['platform']}] {job['game']} - {job['state']}"
+    if job["not_before"] and job["state"] == "queued":
+        start = datetime.datetime.fromtimestamp(job["not_before"])
+        line += f" until {start:%H:%M}"
+    if job["error"]:
+        line += f" ({job['error']})"
+    return line
+
+
+def tail_job(client: DaemonClient, job_id: int):
+    try:
+        job = client.tail(job_id)
+    except KeyboardInterrupt:
+        print(f"\nStopped watching, the job keeps running. Use --tail {job_id}")
+        return
+    print(format_job(job))
+    if job["error"]:
+        sys.exit(1)
+
+
+def queue_link(
+    client: DaemonClient,
+    platform: str,
+    game: str,
+    reverse: bool,
+    at: Optional[Tuple[int, int]] = None,
+):
+    job = client.queue(platform, game, reverse, at)
+    print(f"Queued {format_job(job)}")
+    tail_job(client, job["id"])
+
+
+def list_jobs(client: DaemonClient):
+    jobs = client.jobs()
+    if not jobs:
+        print("No jobs")
+    for job in jobs:
+        print(format_job(job))
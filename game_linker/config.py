@@ -1,20 +1,54 @@
 import argparse
+import functools
 import os
+import queue
 import re
 import sys
+import threading
 from typing import Dict
+from typing import FrozenSet
+from typing import Iterator
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Set
 from typing import Tuple
 
-import yaml
-
+from game_linker import instrument
 from game_linker.choice_prompter import ChoicePrompter
+from game_linker.config_model import CompiledConfig
+from game_linker.config_model import load_config
+from game_linker.config_model import PlatformConfig
+from game_linker.copy_engine import DEFAULT_BUFFER_SIZE
+from game_linker.copy_engine import DEFAULT_SMALL_FILE_SIZE
+from game_linker.copy_engine import DEFAULT_WORKERS
+from game_linker.fast_copy import COPY_STRATEGIES
+from game_linker.fast_copy import STRATEGY_AUTO
+from game_linker.game_index import GameIndex
+from game_linker.game_index import GameInfo
+from game_linker.instrument import metrics
+from game_linker.journal import Journal
+from game_linker.scanner import DEFAULT_SCAN_TIMEOUT
+from game_linker.scanner import iter_concurrently
+from game_linker.search import GameSearch
+from game_linker.sizes import get_dir_size
+from game_linker.throttle import Throttle
+from game_linker.verify import VERIFY_MODES
 from game_linker.util import ask_yes_no
+from game_linker.util import format_size
+from game_linker.util import is_link
+from game_linker.util import lower_io_priority
+
+
+def _time_of_day(text: str) -> Tuple[int, int]:
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", text.strip())
+    if not match or int(match[1]) > 23 or int(match[2]) > 59:
+        raise argparse.ArgumentTypeError(f"{text} is not a time like 23:30")
+    return int(match[1]), int(match[2])
 
 
 class GameLinkerConfig:
-    def __init__(self):
+    def __init__(self, argv: Optional[List[str]] = None):
         self.config_path = os.path.join(os.path.dirname(__file__), "..", "config.yaml")
         self.platform: Optional[str] = None
         self.target = "ssd"
@@ -23,8 +57,40 @@ class GameLinkerConfig:
         self.reverse = False
         self.create_dirs = False
         self.exact = False
+        self.compiled: Optional[CompiledConfig] = None
+        self.config: Mapping[str, PlatformConfig] = {}
+        self.settings: Mapping = {}
+        self.workers = DEFAULT_WORKERS
+        self.buffer_size = DEFAULT_BUFFER_SIZE
+        self.small_file_size = DEFAULT_SMALL_FILE_SIZE
+        self.stream_scan = False
+        self.scan_timeout = DEFAULT_SCAN_TIMEOUT
+        self.sync = False
+        self.sync_hash = False
+        self.reserve = 0
+        self.verify: Optional[str] = None
+        self.copy_strategy = STRATEGY_AUTO
+        self.plan = False
+        self.index: Optional[GameIndex] = None
+        self.list_games = False
+        self.audit = False
+        self.batch = False
+        self.batch_patterns: List[str] = []
+        self.serve = False
+        self.queue = False
+        self.queue_at: Optional[Tuple[int, int]] = None
+        self.show_jobs = False
+        self.tail_job: Optional[int] = None
+        self.daemon_port: Optional[int] = None
+        self.throttle: Optional[Throttle] = None
+        self.set_throttle = False
+        # bytes and files per second for --throttle, None keeps a limit
+        self.new_limits: Tuple[Optional[float], Optional[float]] = (None, None)
         self._ignore_dirs = None
-        self._parse_arguments()
+        # games the prompt shows without a size, sized on a background thread
+        self._unsized: Optional[queue.Queue] = None
+        self._queued_sizes: Set[Tuple[str, str, str]] = set()
+        self._parse_arguments(argv)
 
     def _build_arg_parser(self):
         parser = argparse.ArgumentParser(
@@ -56,23 +122,238 @@ class GameLinkerConfig:
             action="store_true",
             help="finds the game using exact match",
         )
-        parser.add_argument("game", nargs="?", help="full/partial game name")
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            help="number of copy threads (0 copies with shutil)",
+        )
+        parser.add_argument(
+            "--buffer-size", type=int, help="copy buffer size in KiB per thread"
+        )
+        parser.add_argument(
+            "--small-file-size",
+            type=int,
+            help="files below this many KiB are copied in batches (0 disables)",
+        )
+        parser.add_argument(
+            "--stream-scan",
+            action="store_true",
+            help="start copying while the total size is still being counted",
+        )
+        parser.add_argument(
+            "--no-index",
+            action="store_true",
+            help="scans the game directories instead of using the game index",
+        )
+        parser.add_argument(
+            "-l",
+            "--list",
+            action="store_true",
+            help="lists the games with their size and location",
+        )
+        parser.add_argument(
+            "--audit",
+            action="store_true",
+            help="finds dangling or misdirected links and games that are in both "
+            "or only the target location, and offers to repair them",
+        )
+        parser.add_argument(
+            "--scan-timeout",
+            type=float,
+            help="seconds to wait for a game directory before skipping it",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="only copies changed files into an existing copy of the game, "
+            "with --reverse the copy in the target is kept",
+        )
+        parser.add_argument(
+            "--sync-hash",
+            action="store_true",
+            help="also compares the content of files with --sync",
+        )
+        parser.add_argument(
+            "--reserve",
+            type=int,
+            help="MiB to keep free on the destination drive when moving",
+        )
+        parser.add_argument(
+            "--verify",
+            choices=VERIFY_MODES,
+            help="fsync every copied file, or also read it back and compare hashes",
+        )
+        parser.add_argument(
+            "--copy-strategy",
+            choices=COPY_STRATEGIES,
+            help="how the copy engine copies file data (default: auto)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=float,
+            help="MiB per second to copy at most, so a game playing from the same "
+            "drive does not stutter (0 removes the limit)",
+        )
+        parser.add_argument(
+            "--file-limit",
+            type=float,
+            help="files per second to copy at most (0 removes the limit)",
+        )
+        parser.add_argument(
+            "--low-priority",
+            action="store_true",
+            help="lets other programs use the disks first while copying",
+        )
+        parser.add_argument(
+            "--plan",
+            action="store_true",
+            help="proposes which games to link or unlink to fit the target drive",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch",
+            action="store_true",
+            help="moves every game matching the given names or globs in one run",
+        )
+        parser.add_argument(
+            "--batch-file", help="file with a game name or glob on each line"
+        )
+        parser.add_argument(
+            "--report",
+            help="writes timings of each phase, counters and the slowest files as "
+            "json, or as a json line per event if the file ends with .jsonl",
+        )
+        parser.add_argument(
+            "--profile", help="runs with cProfile and writes the stats to this file"
+        )
+        parser.add_argument(
+            "--serve",
+            action="store_true",
+            help="keeps running and links the games queued with --queue",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="hands the link to the --serve process and shows its progress",
+        )
+        parser.add_argument(
+            "--at",
+            type=_time_of_day,
+            help="with --queue, waits until this time of day (HH:MM) to start",
+        )
+        parser.add_argument(
+            "--jobs", action="store_true", help="lists the jobs of the --serve process"
+        )
+        parser.add_argument(
+            "--tail", type=int, help="shows the progress of a job of --serve"
+        )
+        parser.add_argument(
+            "--throttle",
+            action="store_true",
+            help="changes the --limit and --file-limit of the --serve process",
+        )
+        parser.add_argument(
+            "game",
+            nargs="*",
+            help="full/partial game name, or several names/globs with --batch",
+        )
         return parser
 
-    def get_platform_dirs(self, platform: str) -> Dict[str, str]:
-        return self.config[platform]["dirs"]
+    def get_platform_dirs(self, platform: str) -> Mapping[str, str]:
+        return self.config[platform].dirs
 
-    def _parse_arguments(self):
+    def _parse_arguments(self, argv: Optional[List[str]] = None):
         parser = self._build_arg_parser()
-        args = parser.parse_args()
-
-        self.game = args.game or ""
-        self.exact = args.exact
+        args = parser.parse_args(argv)
+        if args.report or args.profile:
+            instrument.start(args.report, args.profile)
+
+        self.batch = args.batch or bool(args.batch_file)
+        if self.batch:
+            self.batch_patterns = list(args.game)
+            if args.batch_file:
+                with open(args.batch_file, "r") as f:
+                    self.batch_patterns.extend(line.strip() for line in f)
+            self.batch_patterns = [p for p in self.batch_patterns if p]
+            if not self.batch_patterns:
+                sys.exit("--batch used, but no game names supplied")
+        elif len(args.game) > 1:
+            parser.error("only one game can be given without --batch")
+        self.game = "" if self.batch else "".join(args.game)
+        self.exact = args.exact and not self.batch
 
         if args.config:
             self.config_path = args.config
-        with open(self.config_path, "r") as f:
-            self.config = yaml.load(f, Loader=yaml.FullLoader)
+        self.compiled = load_config(self.config_path)
+        self.config = self.compiled.platforms
+        self.settings = self.compiled.settings
+
+        self.workers = self.settings.get("workers", DEFAULT_WORKERS)
+        if args.workers is not None:
+            self.workers = args.workers
+        if self.workers < 0:
+            sys.exit("--workers cannot be negative")
+        buffer_size = self.settings.get("buffer_size")
+        if args.buffer_size is not None:
+            buffer_size = args.buffer_size
+        if buffer_size is not None:
+            if buffer_size < 1:
+                sys.exit("--buffer-size must be at least 1 KiB")
+            self.buffer_size = buffer_size * 1024
+        small_file_size = self.settings.get("small_file_size")
+        if args.small_file_size is not None:
+            small_file_size = args.small_file_size
+        if small_file_size is not None:
+            if small_file_size < 0:
+                sys.exit("--small-file-size cannot be negative")
+            self.small_file_size = small_file_size * 1024
+        self.stream_scan = args.stream_scan or self.settings.get("stream_scan", False)
+        self.scan_timeout = self.settings.get("scan_timeout", DEFAULT_SCAN_TIMEOUT)
+        if args.scan_timeout is not None:
+            self.scan_timeout = args.scan_timeout
+        self.sync_hash = args.sync_hash or self.settings.get("sync_hash", False)
+        self.sync = args.sync or self.sync_hash or self.settings.get("sync", False)
+        reserve = self.settings.get("reserve_space", 0)
+        if args.reserve is not None:
+            reserve = args.reserve
+        self.reserve = reserve * 1024 * 1024
+        self.verify = args.verify or self.settings.get("verify")
+        if self.verify and self.verify not in VERIFY_MODES:
+            sys.exit(f"verify must be one of {', '.join(VERIFY_MODES)}")
+        self.copy_strategy = args.copy_strategy or self.settings.get(
+            "copy_strategy", STRATEGY_AUTO
+        )
+        if self.copy_strategy not in COPY_STRATEGIES:
+            sys.exit(f"copy_strategy must be one of {', '.join(COPY_STRATEGIES)}")
+        self.daemon_port = self.settings.get("daemon_port")
+        limit = self.settings.get("limit", 0)
+        if args.limit is not None:
+            limit = args.limit
+        file_limit = self.settings.get("file_limit", 0)
+        if args.file_limit is not None:
+            file_limit = args.file_limit
+        if limit < 0 or file_limit < 0:
+            sys.exit("--limit and --file-limit cannot be negative")
+        self.set_throttle = args.throttle
+        if self.set_throttle:
+            if args.limit is None and args.file_limit is None:
+                sys.exit("--throttle used, but no --limit or --file-limit supplied")
+            # only the given limits are changed
+            self.new_limits = (
+                args.limit * 1024 * 1024 if args.limit is not None else None,
+                args.file_limit,
+            )
+            return
+        if limit or file_limit or args.serve:
+            # --serve can have its limits changed later
+            self.throttle = Throttle(limit * 1024 * 1024, file_limit)
+        if args.low_priority or self.settings.get("low_priority", False):
+            # before any copy thread is started, they inherit the priority
+            if not lower_io_priority():
+                print("Could not lower the I/O priority")
+        if not args.no_index and self.settings.get("index", True):
+            self.index = GameIndex(self.index_path)
 
         if args.source:
             self.source = args.source
@@ -81,6 +362,16 @@ class GameLinkerConfig:
 
         if args.reverse:
             self.reverse = True
+        self.serve = args.serve
+        self.show_jobs = args.jobs
+        self.tail_job = args.tail
+        if self.serve or self.show_jobs or self.tail_job is not None:
+            # the games are picked by the clients
+            return
+        self.queue = args.queue or args.at is not None
+        self.queue_at = args.at
+        if self.queue and self.batch:
+            sys.exit("--queue only works with a single game")
         if args.platform:
             self.platform = args.platform
             if self.platform not in self.config:
@@ -88,27 +379,21 @@ class GameLinkerConfig:
         else:
             current_dir = os.getcwd()
             self.platform = self._get_platform_from_dir(current_dir)
+        self.list_games = args.list
+        self.plan = args.plan
+        self.audit = args.audit
         if not self.platform:
+            if self.list_games or self.batch or self.plan or self.audit:
+                # works across every platform
+                return
             if self.reverse:
                 self.platform, self.game = self._prompt_for_all_games()
                 self.exact = True
             else:
                 self.platform = self._prompt_for_platform()
-        platform_dirs = self.get_platform_dirs(self.platform)
-        for location, directory in platform_dirs.items():
-            if "windowsapps" in directory.lower():
-                sys.exit(
-                    "Currently linking microsoft store apps is not supported. Use the built-in windows app move under settings."
-                )
-
-        if self.source not in platform_dirs:
-            sys.exit(f"{self.source} not in {self.platform} config")
-
-        if self.target not in platform_dirs:
-            sys.exit(f"{self.target} not in {self.platform} config")
-
-        if self.source_path.lower() == self.target_path.lower():
-            sys.exit("source path and target path cannot be the same")
+        error = self.get_platform_error(self.platform)
+        if error:
+            sys.exit(error)
 
         self.create_dirs = args.create_dirs
         if not self.create_dirs:
@@ -123,9 +408,30 @@ class GameLinkerConfig:
         if self.exact and not self.game:
             sys.exit("--exact used, but no game name supplied")
 
+    def get_platform_error(self, platform: str) -> Optional[str]:
+        platform_dirs = self.get_platform_dirs(platform)
+        for location, directory in platform_dirs.items():
+            if "windowsapps" in directory.lower():
+                return "Currently linking microsoft store apps is not supported. Use the built-in windows app move under settings."
+
+        if self.source not in platform_dirs:
+            return f"{self.source} not in {platform} config"
+
+        if self.target not in platform_dirs:
+            return f"{self.target} not in {platform} config"
+
+        source_dir = self.get_platform_dir(platform, self.source)
+        target_dir = self.get_platform_dir(platform, self.target)
+        if source_dir.lower() == target_dir.lower():
+            return "source path and target path cannot be the same"
+        return None
+
+    @property
+    def index_path(self) -> str:
+        return f"{os.path.splitext(self.config_path)[0]}.index.json"
+
     def get_platform_dir(self, platform: str, location: str) -> str:
-        platform_dir = os.path.normpath(self.config[platform]["dirs"][location])
-        return platform_dir
+        return self.config[platform].dirs[location]
 
     @property
     def source_dir(self) -> str:
@@ -143,40 +449,37 @@ class GameLinkerConfig:
     def target_path(self) -> str:
         return os.path.join(self.target_dir, self.game)
 
-    def get_ignore_dirs_for_platform(self, platform: str) -> List[str]:
-        ignore_dirs = []
-        if "ignore" in self.config[platform]:
-            ignore_dirs = self.config[platform]["ignore"]
-            ignore_dirs = [dir.lower() for dir in ignore_dirs if dir]
-        return ignore_dirs
+    def get_ignore_dirs_for_platform(self, platform: str) -> FrozenSet[str]:
+        return self.config[platform].ignore
 
     @property
-    def ignore_dirs(self) -> List[str]:
+    def ignore_dirs(self) -> FrozenSet[str]:
         if self._ignore_dirs is None:
             self._ignore_dirs = self.get_ignore_dirs_for_platform(self.platform)
         return self._ignore_dirs
 
-    def _is_game_match(self, game: str) -> bool:
-        if self.exact:
-            return game.lower() == self.game.lower()
-        elif self.game:
-            return self.game.lower() in game.lower()
-        else:
-            return True
+    def _is_game_name(self, name: str, ignore_dirs: FrozenSet[str]) -> bool:
+        name = name.lower()
+        if name in ignore_dirs:
+            return False
+        # partial names are matched by search_games once the games are listed
+        return not self.exact or name == self.game.lower()
+
+    def search_games(self, games: List[str]) -> List[str]:
+        """The games matching the game name, best match first."""
+        if not self.game or self.exact:
+            return games
+        return GameSearch(games).search(self.game)
 
     def is_game_dir(
-        self, entry: os.DirEntry, ignore_dirs: Optional[List[str]] = None
+        self, entry: os.DirEntry, ignore_dirs: Optional[FrozenSet[str]] = None
     ) -> bool:
         if ignore_dirs is None:
             ignore_dirs = self.ignore_dirs
-        return (
-            entry.is_dir()
-            and self._is_game_match(entry.name)
-            and entry.name.lower() not in ignore_dirs
-        )
+        return entry.is_dir() and self._is_game_name(entry.name, ignore_dirs)
 
     def get_games_in_directory(
-        self, directory: str, ignore_dirs: Optional[List[str]] = None
+        self, directory: str, ignore_dirs: Optional[FrozenSet[str]] = None
     ) -> List[str]:
         if not os.path.exists(directory):
             return []
@@ -192,7 +495,40 @@ class GameLinkerConfig:
     def get_games_for_platform(self, platform: str, location: str) -> List[str]:
         location_dir = self.get_platform_dir(platform, location)
         ignore_dirs = self.get_ignore_dirs_for_platform(platform)
-        return self.get_games_in_directory(location_dir, ignore_dirs)
+        with metrics.phase("scan_games"):
+            if self.index is None:
+                games = self.get_games_in_directory(location_dir, ignore_dirs)
+            else:
+                games = [
+                    game.name
+                    for game in self.index.get_games(platform, location, location_dir)
+                    if self._is_game_name(game.name, ignore_dirs)
+                ]
+        metrics.add("game_dirs", len(games))
+        return games
+
+    def get_game_infos(self, platform: str) -> List[GameInfo]:
+        """Gets the games in every location of the platform, with their sizes."""
+        index = self.index or GameIndex(self.index_path)
+        ignore_dirs = self.get_ignore_dirs_for_platform(platform)
+        infos = []
+        with metrics.phase("game_infos"):
+            for location in self.get_platform_dirs(platform):
+                location_dir = self.get_platform_dir(platform, location)
+                for game in index.get_games(platform, location, location_dir):
+                    if self._is_game_name(game.name, ignore_dirs):
+                        infos.append(
+                            index.get_game(
+                                platform, location, location_dir, game.name, size=True
+                            )
+                        )
+        if self.index is not None:
+            self.index.save()
+        if self.game and not self.exact:
+            matches = set(self.search_games([info.name for info in infos]))
+            infos = [info for info in infos if info.name in matches]
+        infos.sort(key=lambda g: g.name.lower())
+        return infos
 
     @property
     def source_games(self) -> List[str]:
@@ -202,19 +538,183 @@ class GameLinkerConfig:
     def target_games(self) -> List[str]:
         return self.get_games_in_directory(self.target_dir)
 
-    def get_games(self, platform: str) -> List[str]:
-        target_games = set(self.get_games_for_platform(platform, self.target))
-        if self.reverse:
-            # only list games in the target directory
+    @property
+    def scan_locations(self) -> List[str]:
+        # reverse only lists games in the target directory
+        return [self.target] if self.reverse else [self.source, self.target]
+
+    def _has_journal(self, platform: str, game: str) -> bool:
+        dst = os.path.join(self.get_platform_dir(platform, self.target), game)
+        return os.path.exists(Journal.path_for(dst))
+
+    def _has_copy(self, platform: str, game: str) -> bool:
+        source_path = os.path.join(self.get_platform_dir(platform, self.source), game)
+        return not is_link(source_path)
+
+    def _combine_games(
+        self,
+        platform: str,
+        source_games: Set[str],
+        target_games: Set[str],
+        reverse: Optional[bool] = None,
+    ) -> List[str]:
+        if self.reverse if reverse is None else reverse:
             games = target_games
         else:
             # list games in source or target, but not both
-            source_games = set(self.get_games_for_platform(platform, self.source))
             games = source_games.symmetric_difference(target_games)
+            # unless the move between them was interrupted, or can be synced
+            games.update(
+                game
+                for game in source_games.intersection(target_games)
+                if self._has_journal(platform, game)
+                or (self.sync and self._has_copy(platform, game))
+            )
         games = list(games)
         games.sort(key=lambda g: g.lower())
         return games
 
+    def get_games(self, platform: str, reverse: Optional[bool] = None) -> List[str]:
+        """The games that can be linked, or unlinked if reverse, best match first."""
+        reverse = self.reverse if reverse is None else reverse
+        target_games = set(self.get_games_for_platform(platform, self.target))
+        source_games = set()
+        if not reverse:
+            source_games = set(self.get_games_for_platform(platform, self.source))
+        if self.index is not None:
+            self.index.save()
+        return self.search_games(
+            self._combine_games(platform, source_games, target_games, reverse)
+        )
+
+    def iter_all_games(self, platforms: List[str]) -> Iterator[Tuple[str, List[str]]]:
+        """Scans every location of the platforms at once.
+
+        Yields the games of each platform, in the order of platforms, as soon as
+        all of its locations and those of the platforms before it are scanned. A
+        platform is left out, with a warning, if one of its directories fails or
+        does not respond within the scan timeout, e.g. a drive that is asleep.
+        """
+        jobs = {}
+        ordered = []
+        for platform in platforms:
+            error = self.get_platform_error(platform)
+            if error:
+                print(f"Skipping {platform} ({error})")
+                continue
+            ordered.append(platform)
+            for location in self.scan_locations:
+                jobs[(platform, location)] = functools.partial(
+                    self.get_games_for_platform, platform, location
+                )
+        results = {}
+        # platforms that are fully scanned, None once skipped
+        scanned: Dict[str, Optional[List[str]]] = {}
+        try:
+            for (platform, location), games, error in iter_concurrently(
+                jobs, self.scan_timeout
+            ):
+                if platform in scanned:
+                    continue
+                if error is not None:
+                    scanned[platform] = None
+                    print(f"Skipping {platform} ({location}: {error})")
+                else:
+                    results[(platform, location)] = games
+                    if all((platform, loc) in results for loc in self.scan_locations):
+                        scanned[platform] = self._combine_games(
+                            platform,
+                            set(results.get((platform, self.source), [])),
+                            set(results[(platform, self.target)]),
+                        )
+                # a platform that finished early waits for the ones before it
+                while ordered and ordered[0] in scanned:
+                    platform = ordered.pop(0)
+                    if scanned[platform] is not None:
+                        yield platform, scanned[platform]
+        finally:
+            if self.index is not None:
+                self.index.save()
+
+    def get_all_games(self, platforms: List[str]) -> Dict[str, List[str]]:
+        with metrics.phase("scan_platforms"):
+            all_games = dict(self.iter_all_games(platforms))
+        return {
+            platform: all_games[platform]
+            for platform in platforms
+            if platform in all_games
+        }
+
+    def get_game_size(self, platform: str, location: str, game: str) -> int:
+        directory = self.get_platform_dir(platform, location)
+        if self.index is not None:
+            info = self.index.get_game(platform, location, directory, game, size=True)
+            self.index.save()
+            if info is not None and info.size is not None:
+                return info.size
+        return get_dir_size(os.path.join(directory, game)).size
+
+    def _size_games(self):
+        while True:
+            platform, location, directory, game = self._unsized.get()
+            try:
+                self.index.get_game(platform, location, directory, game, size=True)
+                self.index.save()
+            except OSError:
+                pass
+            finally:
+                self._unsized.task_done()
+
+    def _size_later(self, platform: str, location: str, directory: str, game: str):
+        key = (platform, location, game)
+        if key in self._queued_sizes:
+            return
+        self._queued_sizes.add(key)
+        if self._unsized is None:
+            self._unsized = queue.Queue()
+            threading.Thread(target=self._size_games, daemon=True).start()
+        self._unsized.put((platform, location, directory, game))
+
+    def describe_game(self, platform: str, game: str) -> str:
+        """The game with its size and the locations it is in, as the prompt shows it.
+
+        Only what the index already has is shown, without touching the drives.
+        The scanned locations are up to date, the others may be asleep and show
+        what they had when last scanned. Sizing a game walks all of its files, so
+        the games of the scanned locations are sized in the background for later
+        pages and runs.
+        """
+        if self.index is None:
+            return game
+        size = None
+        unsized = False
+        locations = []
+        for location, directory in self.get_platform_dirs(platform).items():
+            info = self.index.get_cached_game(platform, location, directory, game)
+            if info is None:
+                continue
+            if info.linked:
+                locations.append(f"{location} link")
+                continue
+            locations.append(location)
+            if info.size is None:
+                unsized = True
+                if location in self.scan_locations:
+                    self._size_later(platform, location, directory, game)
+            else:
+                size = max(size or 0, info.size)
+        if not locations:
+            return game
+        if size is not None:
+            size_text = format_size(size)
+        else:
+            size_text = "size unknown" if unsized else "link"
+        return f"{game} - {size_text} - {'/'.join(locations)}"
+
+    def _describe_choice(self, choice: str) -> str:
+        platform, game = re.match(r"\[(.+?)\] (.+)", choice).groups()
+        return f"[{platform}] {self.describe_game(platform, game)}"
+
     @property
     def games(self) -> List[str]:
         return self.get_games(self.platform)
@@ -226,24 +726,37 @@ class GameLinkerConfig:
         platform = prompter.choose()
         return platform
 
-    def _get_platform_from_dir(self, directory: str) -> str:
-        directory = os.path.normpath(directory).lower()
-        for platform, platform_dirs in self.config.items():
-            for platform_dir in self.get_platform_dirs(platform).values():
-                platform_dir = os.path.normpath(platform_dir)
-                if directory == platform_dir:
-                    return platform
+    def _get_platform_from_dir(self, directory: str) -> Optional[str]:
+        return self.compiled.dir_platforms.get(os.path.normpath(directory).lower())
 
     def _prompt_for_all_games(self) -> Tuple[str, str]:
         platforms = list(self.config.keys())
         platforms.sort(key=lambda p: p.lower())
-        all_games = []
-        for platform in platforms:
-            platform_games = self.get_games(platform)
-            platform_games = [f"[{platform}] {game}" for game in platform_games]
-            all_games.extend(platform_games)
-        prompter = ChoicePrompter("What game? ", all_games, 10)
+        if self.game:
+            all_games = [
+                (platform, game)
+                for platform, platform_games in self.get_all_games(platforms).items()
+                for game in platform_games
+            ]
+            # ranks the games of every platform together
+            all_games = GameSearch(all_games, key=lambda g: g[1]).search(self.game)
+            if not all_games:
+                sys.exit(f'No games found matching "{self.game}"')
+        else:
+            # the first platforms are shown while slower drives are still scanned
+            all_games = (
+                (platform, game)
+                for platform, platform_games in self.iter_all_games(platforms)
+                for game in platform_games
+            )
+        choices = (f"[{platform}] {game}" for platform, game in all_games)
+        prompter = ChoicePrompter(
+            "What game? ", choices, 10, describe=self._describe_choice
+        )
         game = prompter.choose()
+        if self.index is not None:
+            # keeps the locations scanned for the prompt
+            self.index.save()
         match = re.match(r"\[(.+?)\] (.+)", game)
         platform = match.group(1)
         game = match.group(2)
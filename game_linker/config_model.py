@@ -0,0 +1,145 @@
+import json
+import os
+from types import MappingProxyType
+from typing import Any
+from typing import FrozenSet
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+
+CACHE_VERSION = 1
+SETTINGS_KEY = "settings"
+
+
+class PlatformConfig(NamedTuple):
+    name: str
+    # location => normalized dir
+    dirs: Mapping[str, str]
+    # lowercase names of the dirs that are not games
+    ignore: FrozenSet[str]
+    # lowercase game name => priority, used by --plan
+    priority: Mapping[str, int]
+
+
+class CompiledConfig(NamedTuple):
+    """The config file, parsed and normalized once.
+
+    Everything is read only, so the compiled config can be shared and cached.
+    """
+
+    settings: Mapping[str, Any]
+    platforms: Mapping[str, PlatformConfig]
+    # lowercase normalized dir => the platform it belongs to
+    dir_platforms: Mapping[str, str]
+
+    def to_json(self) -> dict:
+        return {
+            "settings": dict(self.settings),
+            "platforms": {
+                name: {
+                    "dirs": dict(platform.dirs),
+                    "ignore": sorted(platform.ignore),
+                    "priority": dict(platform.priority),
+                }
+                for name, platform in self.platforms.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "CompiledConfig":
+        platforms = {
+            name: PlatformConfig(
+                name,
+                MappingProxyType(platform["dirs"]),
+                frozenset(platform["ignore"]),
+                MappingProxyType(platform["priority"]),
+            )
+            for name, platform in data["platforms"].items()
+        }
+        dir_platforms = {}
+        for name, platform in platforms.items():
+            for platform_dir in platform.dirs.values():
+                dir_platforms.setdefault(platform_dir.lower(), name)
+        return cls(
+            MappingProxyType(data["settings"]),
+            MappingProxyType(platforms),
+            MappingProxyType(dir_platforms),
+        )
+
+
+def compile_config(raw: dict) -> CompiledConfig:
+    """Normalizes the dirs and lowercases the names of a parsed config file."""
+    raw = dict(raw or {})
+    settings = raw.pop(SETTINGS_KEY, None) or {}
+    platforms = {}
+    # everything except the settings section is a platform
+    for name, platform in raw.items():
+        platforms[name] = {
+            "dirs": {
+                location: os.path.normpath(directory)
+                for location, directory in platform["dirs"].items()
+            },
+            "ignore": [
+                ignore.lower() for ignore in platform.get("ignore") or [] if ignore
+            ],
+            "priority": {
+                game.lower(): value
+                for game, value in (platform.get("priority") or {}).items()
+            },
+        }
+    return CompiledConfig.from_json({"settings": settings, "platforms": platforms})
+
+
+def cache_path_for(config_path: str) -> str:
+    return f"{os.path.splitext(config_path)[0]}.compiled.json"
+
+
+def _load_cache(cache_path: str, key: list) -> Optional[CompiledConfig]:
+    try:
+        with open(cache_path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CACHE_VERSION or data.get("key") != key:
+        return None
+    try:
+        return CompiledConfig.from_json(data["config"])
+    except (KeyError, TypeError):
+        return None
+
+
+def parse_yaml(f) -> Any:
+    """Parses the config file with the C loader when pyyaml was built with it."""
+    # yaml is only imported when the cache is stale, it is slow to import
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(f, Loader=loader)
+
+
+def load_config(config_path: str) -> CompiledConfig:
+    """Loads the compiled config, only parsing the file again once it changes.
+
+    The compiled config is cached next to the config file, keyed by its mtime
+    and size.
+    """
+    stat = os.stat(config_path)
+    key = [stat.st_mtime_ns, stat.st_size]
+    cache_path = cache_path_for(config_path)
+    config = _load_cache(cache_path, key)
+    if config is not None:
+        return config
+    with open(config_path, "r") as f:
+        config = compile_config(parse_yaml(f))
+    try:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"version": CACHE_VERSION, "key": key, "config": config.to_json()}, f
+            )
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError):
+        # the cache only saves time, e.g. the config dir might be read only, or a
+        # setting might not fit in json
+        pass
+    return config
@@ -0,0 +1,517 @@
+import errno
+import os
+import queue
+import shutil
+import stat
+import threading
+import time
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+from typing import Union
+
+from game_linker import fast_copy
+from game_linker.fast_copy import COPY_STRATEGIES
+from game_linker.fast_copy import STRATEGY_AUTO
+from game_linker.fast_copy import STRATEGY_COPY_FILE_RANGE
+from game_linker.fast_copy import STRATEGY_READINTO
+from game_linker.fast_copy import STRATEGY_REFLINK
+from game_linker.fast_copy import STRATEGY_SENDFILE
+from game_linker.instrument import metrics
+from game_linker.journal import Journal
+from game_linker.manifest import Manifest
+from game_linker.manifest import ManifestDiff
+from game_linker.manifest import ManifestEntry
+from game_linker.throttle import Throttle
+from game_linker.util import ensure_free_space
+from game_linker.util import hash_file
+from game_linker.verify import StreamHasher
+from game_linker.verify import sync_file
+from game_linker.verify import VERIFY_READBACK
+
+if TYPE_CHECKING:
+    # tqdm is slow to import, only the copy progress needs it
+    from tqdm import tqdm
+
+DEFAULT_WORKERS = 4
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_SMALL_FILE_SIZE = 256 * 1024
+# a batch of small files is queued once it reaches either limit
+BATCH_FILES = 64
+BATCH_SIZE = 8 * 1024 * 1024
+# large files are streamed one at a time, so a hdd reads them sequentially
+STREAMING_WORKERS = 1
+# the progress bar is updated at most this often, in seconds
+BAR_INTERVAL = 0.1
+
+Job = Tuple[str, str, ManifestEntry]
+
+
+class CopyEngine:
+    """Copies a file or directory tree using a pool of worker threads.
+
+    A single walker replays the manifest entries of src, creating each dir in dst
+    and queueing a job for each file. The workers copy those files in parallel and
+    report the bytes written to one shared progress bar.
+
+    If no entries are given, src is scanned while copying. With grow_total the
+    scan runs on its own thread and increases the bar's total as it finds each
+    file, so the total keeps ahead of the copy while the scan is still running.
+    With a reserve, the free space in dst is checked once the scan has the full
+    size, which is long before the copy catches up. If it does not fit, the copy
+    stops and raises the ENOSPC error instead of filling the drive.
+
+    With a journal, every copied file is recorded. If the journal already exists
+    the copy resumes into the existing dst, skipping the files it lists.
+
+    sync updates an existing copy in dst, copying only what the diff lists.
+
+    verify can be "fsync", which flushes every file to disk before it counts as
+    copied, or "readback", which also hashes each buffer as it is copied and
+    compares that with a hash of the file read back from disk.
+
+    strategy picks how the data is copied. "auto" tries a reflink, then the
+    kernel side copy_file_range and sendfile, and falls back to reading into a
+    reused buffer. Naming one strategy uses only that one, e.g. to benchmark it.
+
+    Files smaller than small_file_size are queued in batches ordered by inode,
+    which is roughly their order on disk, and only get their mode and times
+    copied. Larger files go to a separate streaming lane instead, so a few huge
+    files do not hold up the small ones. A small_file_size of 0 queues every
+    file on its own in the worker pool. Unless they are cloned, the larger files
+    are preallocated in dst, and the source pages of every file are dropped from
+    the page cache once copied.
+
+    A throttle limits the bytes and files all workers copy per second, its
+    limits are shown next to the progress bar.
+    """
+
+    def __init__(
+        self,
+        src: str,
+        dst: str,
+        bar: Optional["tqdm"] = None,
+        workers: int = DEFAULT_WORKERS,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        entries: Optional[Iterable[ManifestEntry]] = None,
+        grow_total: bool = False,
+        journal: Optional[Journal] = None,
+        verify: Optional[str] = None,
+        strategy: str = STRATEGY_AUTO,
+        small_file_size: int = DEFAULT_SMALL_FILE_SIZE,
+        throttle: Optional[Throttle] = None,
+        reserve: Optional[int] = None,
+    ):
+        if workers < 1:
+            raise ValueError("At least one worker is required.")
+        if strategy not in COPY_STRATEGIES:
+            raise ValueError(f"Unknown copy strategy {strategy}.")
+        self.src = src
+        self.dst = dst
+        self.bar = bar
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.entries = entries
+        self.grow_total = grow_total
+        self.journal = journal
+        self.resume = journal is not None and journal.load()
+        self.into_existing = self.resume
+        self.verify = verify
+        self.strategy = strategy
+        self.small_file_size = small_file_size
+        self.throttle = throttle
+        self.reserve = reserve
+        self._space_error: Optional[OSError] = None
+        self._unsupported = set()
+        self.bytes_copied = 0
+        self.seconds = 0.0
+        self.errors: List[Tuple[str, str, str]] = []
+        # files handed to the workers and files they got through, a worker that
+        # died without recording an error leaves them apart
+        self._queued = 0
+        self._finished = 0
+        self._jobs: queue.Queue = queue.Queue(maxsize=workers * 4)
+        self._streaming_jobs: queue.Queue = queue.Queue(maxsize=STREAMING_WORKERS * 4)
+        self._lock = threading.Lock()
+        self._unreported = 0
+        self._last_report = 0.0
+        self._local = threading.local()
+
+    def _update_bar(self, n: int):
+        if self.bar is not None:
+            with self._lock:
+                self.bar.update(n)
+
+    def _add_copied(self, n: int):
+        with self._lock:
+            self.bytes_copied += n
+            if self.bar is None:
+                return
+            # updating the bar for every chunk of every small file adds up
+            self._unreported += n
+            now = time.monotonic()
+            if now - self._last_report >= BAR_INTERVAL:
+                if self.throttle is not None:
+                    # the limits can change while copying
+                    self.bar.set_postfix_str(self.throttle.describe(), refresh=False)
+                self.bar.update(self._unreported)
+                self._unreported = 0
+                self._last_report = now
+
+    def _add_throttled(self, n: int):
+        self._add_copied(n)
+        self.throttle.take_bytes(n)
+
+    def _flush_bar(self):
+        if self.bar is not None:
+            with self._lock:
+                self.bar.update(self._unreported)
+                self._unreported = 0
+
+    def _grow_bar(self, n: int):
+        if self.bar is not None:
+            with self._lock:
+                self.bar.total += n
+
+    def _add_error(self, src: str, dst: str, error: Exception):
+        with self._lock:
+            self.errors.append((src, dst, str(error)))
+
+    def _copy_file(self, src: str, dst: str, entry: ManifestEntry):
+        if self.into_existing and (entry.is_link or os.path.islink(dst)):
+            # never write through a link left in dst
+            if os.path.lexists(dst):
+                os.remove(dst)
+        if entry.is_link:
+            os.symlink(os.readlink(src), dst)
+            return
+        if self.throttle is not None:
+            self.throttle.take_file()
+        start = time.perf_counter()
+        hasher = self._get_hasher() if self.verify == VERIFY_READBACK else None
+        try:
+            with open(src, "rb", buffering=0) as fsrc, open(dst, "wb") as fdst:
+                src_stat = os.fstat(fsrc.fileno())
+                with metrics.phase("copy_data", log=False):
+                    self._copy_data(fsrc, fdst, src_stat.st_size, hasher)
+                if self.verify:
+                    with metrics.phase("verify", log=False):
+                        sync_file(fdst)
+            file_hash = None
+            if hasher is not None:
+                with metrics.phase("verify", log=False):
+                    file_hash = hasher.hexdigest()
+        except BaseException:
+            # the buffers hashed so far must not end up in the next file's hash
+            self._close_hasher()
+            raise
+        if hasher is not None:
+            with metrics.phase("verify", log=False):
+                if hash_file(dst, self.buffer_size) != file_hash:
+                    raise OSError(errno.EIO, "Copy does not match the source", dst)
+        with metrics.phase("copystat", log=False):
+            if entry.size < self.small_file_size:
+                # skips the extra stat and the extended attributes copystat copies
+                os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+                os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+            else:
+                shutil.copystat(src, dst)
+        if self.journal is not None:
+            # verify already flushed the file to disk
+            self.journal.record(entry, dst, file_hash, synced=bool(self.verify))
+        metrics.add_file(src, entry.size, time.perf_counter() - start)
+
+    def _copy_data(self, fsrc, fdst, size: int, hasher: Optional[StreamHasher]):
+        strategy = self.strategy
+        if hasher is not None:
+            # the data has to pass through python to be hashed
+            strategy = STRATEGY_READINTO
+        if strategy in [STRATEGY_AUTO, STRATEGY_REFLINK] and (
+            STRATEGY_REFLINK not in self._unsupported
+        ):
+            if self._reflink(fsrc, fdst):
+                return
+            # src and dst stay the same, so do not try it again for other files
+            self._unsupported.add(STRATEGY_REFLINK)
+        if not size or size < self.small_file_size:
+            # a small file is written in one go anyway, a game of mostly small
+            # files would still fill the page cache though
+            self._write_data(fsrc, fdst, strategy, hasher)
+            fast_copy.drop_from_cache(fsrc)
+            return
+        # a clone shares the blocks, so only a real copy is laid out up front
+        with fast_copy.sequential_copy(fsrc, fdst, size):
+            self._write_data(fsrc, fdst, strategy, hasher)
+
+    def _write_data(self, fsrc, fdst, strategy: str, hasher: Optional[StreamHasher]):
+        progress = self._add_copied
+        if self.throttle is not None:
+            progress = self._add_throttled
+        for name, fast_copy_file in [
+            (STRATEGY_COPY_FILE_RANGE, fast_copy.copy_file_range),
+            (STRATEGY_SENDFILE, fast_copy.sendfile),
+        ]:
+            if strategy not in [STRATEGY_AUTO, name] or name in self._unsupported:
+                continue
+            if fast_copy_file(fsrc, fdst, self.buffer_size, progress):
+                return
+            self._unsupported.add(name)
+        if strategy not in [STRATEGY_AUTO, STRATEGY_READINTO]:
+            raise OSError(errno.ENOTSUP, f"{strategy} is not supported here", fdst.name)
+        fast_copy.readinto(
+            fsrc,
+            fdst,
+            self._get_buffer(),
+            progress,
+            hasher.update if hasher is not None else None,
+        )
+
+    def _reflink(self, fsrc, fdst) -> bool:
+        if not fast_copy.reflink(fsrc, fdst):
+            return False
+        # a clone shares the blocks instead of writing them, so it is not throttled
+        self._add_copied(os.fstat(fsrc.fileno()).st_size)
+        return True
+
+    def _get_buffer(self) -> bytearray:
+        # each worker thread reuses its own buffer
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = bytearray(self.buffer_size)
+        return buffer
+
+    def _get_hasher(self) -> StreamHasher:
+        # each worker thread gets its own hasher
+        hasher = getattr(self._local, "hasher", None)
+        if hasher is None:
+            hasher = self._local.hasher = StreamHasher()
+        return hasher
+
+    def _close_hasher(self):
+        hasher = getattr(self._local, "hasher", None)
+        if hasher is not None:
+            hasher.close()
+            self._local.hasher = None
+
+    def _run_job(self, job: Job):
+        if self._space_error is not None:
+            # the rest would not fit on the drive
+            return
+        src, dst, entry = job
+        try:
+            self._copy_file(src, dst, entry)
+        except Exception as e:
+            # any failure must stop the source from being removed
+            self._add_error(src, dst, e)
+        with self._lock:
+            self._finished += 1
+
+    def _work(self, jobs: queue.Queue):
+        while True:
+            job: Union[Job, List[Job], None] = jobs.get()
+            if job is None:
+                self._close_hasher()
+                return
+            if isinstance(job, list):
+                for batched_job in job:
+                    self._run_job(batched_job)
+            else:
+                self._run_job(job)
+
+    def _queue_batch(self, batch: List[Job]):
+        # reading in inode order keeps the disk from seeking back and forth
+        batch.sort(key=lambda job: job[2].inode)
+        self._jobs.put(batch)
+
+    def _scan_ahead(self, entries: Iterable[ManifestEntry]) -> Iterator[ManifestEntry]:
+        """Scans on its own thread, so the total grows ahead of the copy.
+
+        The walker blocks while the job queues are full, growing the total as it
+        queues would keep the bar close to full the whole time.
+        """
+        scanned: queue.Queue = queue.Queue()
+
+        def scan():
+            size = 0
+            try:
+                for entry in entries:
+                    if not entry.is_dir:
+                        self._grow_bar(entry.size)
+                        size += entry.size
+                    scanned.put(entry)
+                if self.reserve is not None:
+                    with self._lock:
+                        # what is copied already takes up space in dst
+                        remaining = size - self.bytes_copied
+                    try:
+                        ensure_free_space(self.dst, remaining, self.reserve)
+                    except OSError as e:
+                        self._space_error = e
+                        raise
+            except Exception as e:
+                scanned.put(e)
+            finally:
+                scanned.put(None)
+
+        threading.Thread(target=scan, daemon=True).start()
+        while True:
+            entry = scanned.get()
+            if entry is None:
+                return
+            if isinstance(entry, Exception):
+                raise entry
+            yield entry
+
+    def _walk(self) -> List[Tuple[str, str]]:
+        dirs_copied = []
+        batch: List[Job] = []
+        batch_size = 0
+        try:
+            os.makedirs(self.dst, exist_ok=self.into_existing)
+            dirs_copied.append((self.src, self.dst))
+            entries = self.entries
+            if entries is None:
+                entries = Manifest(self.src).scan()
+            if self.grow_total:
+                entries = self._scan_ahead(entries)
+            for entry in entries:
+                src = os.path.join(self.src, entry.path)
+                dst = os.path.join(self.dst, entry.path)
+                if entry.is_dir:
+                    os.makedirs(dst, exist_ok=True)
+                    dirs_copied.append((src, dst))
+                else:
+                    if self.resume and self.journal.is_done(entry, dst):
+                        self._update_bar(entry.size)
+                        metrics.add("files_resumed")
+                        continue
+                    job = (src, dst, entry)
+                    self._queued += 1
+                    if not self.small_file_size:
+                        self._jobs.put(job)
+                    elif entry.size >= self.small_file_size:
+                        self._streaming_jobs.put(job)
+                    else:
+                        batch.append(job)
+                        batch_size += entry.size
+                        if len(batch) >= BATCH_FILES or batch_size >= BATCH_SIZE:
+                            self._queue_batch(batch)
+                            batch = []
+                            batch_size = 0
+            if batch:
+                self._queue_batch(batch)
+        except OSError as e:
+            self._add_error(self.src, self.dst, e)
+        finally:
+            for _ in range(self.workers):
+                self._jobs.put(None)
+            for _ in range(STREAMING_WORKERS):
+                self._streaming_jobs.put(None)
+        return dirs_copied
+
+    def _copy_tree(self):
+        threads = [
+            threading.Thread(target=self._work, args=(self._jobs,), daemon=True)
+            for _ in range(self.workers)
+        ]
+        threads.extend(
+            threading.Thread(
+                target=self._work, args=(self._streaming_jobs,), daemon=True
+            )
+            for _ in range(STREAMING_WORKERS)
+        )
+        start = time.perf_counter()
+        with metrics.phase("copy_files"):
+            for thread in threads:
+                thread.start()
+            dirs_copied = self._walk()
+            for thread in threads:
+                thread.join()
+        self.seconds = time.perf_counter() - start
+        self._flush_bar()
+        if self._space_error is not None:
+            raise self._space_error
+        if self._finished < self._queued:
+            missing = self._queued - self._finished
+            self._add_error(
+                self.src, self.dst, OSError(f"{missing} files were not copied")
+            )
+        if self.errors:
+            raise shutil.Error(self.errors)
+        # set dir times last, since copying files into them updates the mtime
+        with metrics.phase("copystat_dirs"):
+            for src_dir, dst_dir in reversed(dirs_copied):
+                shutil.copystat(src_dir, dst_dir)
+        metrics.add("dirs", len(dirs_copied))
+
+    def copy(self) -> str:
+        if os.path.isdir(self.src):
+            if os.path.exists(self.dst) and not self.resume:
+                raise FileExistsError(f"{self.dst} already exists")
+            if self.journal is not None:
+                self.journal.open(self.resume)
+            try:
+                self._copy_tree()
+            finally:
+                if self.journal is not None:
+                    self.journal.close()
+        else:
+            if os.path.isdir(self.dst):
+                self.dst = os.path.join(self.dst, os.path.basename(self.src))
+            stat = os.lstat(self.src)
+            entry = ManifestEntry(
+                os.path.basename(self.src),
+                stat.st_size,
+                stat.st_mtime,
+                is_link=os.path.islink(self.src),
+            )
+            start = time.perf_counter()
+            try:
+                self._copy_file(self.src, self.dst, entry)
+            finally:
+                self._close_hasher()
+            self.seconds = time.perf_counter() - start
+            self._flush_bar()
+        return self.dst
+
+    @property
+    def throughput(self) -> float:
+        return self.bytes_copied / self.seconds if self.seconds else 0.0
+
+    def _remove_orphans(self, orphans: List[ManifestEntry]):
+        for entry in orphans:
+            path = os.path.join(self.dst, entry.path)
+            if not os.path.lexists(path):
+                # already removed with its parent dir
+                continue
+            if entry.is_dir:
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def sync(self, diff: ManifestDiff) -> str:
+        self.into_existing = True
+        with metrics.phase("remove_orphans"):
+            self._remove_orphans(diff.orphans)
+        self.entries = diff.changed
+        self._copy_tree()
+        return self.dst
+
+    def move(self) -> str:
+        if os.path.isdir(self.dst) and not self.resume:
+            self.dst = os.path.join(self.dst, os.path.basename(self.src))
+            if os.path.exists(self.dst):
+                raise shutil.Error(f"Destination path '{self.dst}' already exists")
+        dst = self.copy()
+        # the source is only removed once every file has been copied
+        with metrics.phase("remove_src"):
+            if os.path.isdir(self.src) and not os.path.islink(self.src):
+                shutil.rmtree(self.src)
+            else:
+                os.remove(self.src)
+        if self.journal is not None:
+            self.journal.remove()
+        return dst
@@ -1,20 +1,52 @@
 import os
 import shutil
+from typing import Optional
 
-from tqdm import tqdm
-
+from game_linker.copy_engine import CopyEngine
+from game_linker.copy_engine import DEFAULT_BUFFER_SIZE
+from game_linker.copy_engine import DEFAULT_SMALL_FILE_SIZE
+from game_linker.copy_engine import DEFAULT_WORKERS
+from game_linker.fast_copy import STRATEGY_AUTO
+from game_linker.instrument import metrics
+from game_linker.journal import Journal
+from game_linker.manifest import diff_manifests
+from game_linker.manifest import Manifest
+from game_linker.manifest import ManifestDiff
+from game_linker.util import ensure_free_space
 from game_linker.util import fix_path_case
-from game_linker.util import walkdir
+from game_linker.util import format_size
+from game_linker.util import is_same_content
 
 _orig_copyfileobj = shutil.copyfileobj
 
 
 class CopyProgress:
-    def __init__(self, src, dst):
+    def __init__(
+        self,
+        src,
+        dst,
+        stream_scan=False,
+        expected_size=None,
+        reserve=None,
+        output=None,
+        throttle=None,
+    ):
         self.src = src
         self.dst = dst
+        # the bars and messages go to stderr and stdout unless given a file
+        self.output = output
+        self.throttle = throttle
         self.show_current_file = False
-        self._build_bar()
+        self.stream_scan = stream_scan and os.path.isdir(src)
+        self.manifest = None
+        self.engine: Optional[CopyEngine] = None
+        # the size of src from the game index, may be out of date, so it is only
+        # the total of the bar while src is scanned
+        self.expected_size = expected_size
+        # bytes to keep free on the destination, None skips the check
+        self.reserve = reserve
+        with metrics.phase("build_bar"):
+            self._build_bar()
 
     def copyfileobj(self, fsrc, fdst, length=1000 * 1024):
         while True:
@@ -26,40 +58,243 @@ class CopyProgress:
                 self.bar.set_postfix(file=fix_path_case(fsrc.name), refresh=False)
             self.bar.update(len(buf))
 
+    def _scan_src(self):
+        from tqdm import tqdm
+
+        self.manifest = Manifest(self.src)
+        if self.expected_size is None:
+            for _ in tqdm(
+                self.manifest.scan(),
+                unit="files",
+                desc="Determining src size",
+                file=self.output,
+            ):
+                pass
+            return
+        with tqdm(
+            total=self.expected_size,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            desc="Determining src size",
+            file=self.output,
+        ) as bar:
+            for entry in self.manifest.scan():
+                if not entry.is_dir:
+                    bar.update(entry.size)
+
     def _build_bar(self):
+        # imported here so runs that never copy do not pay for it
+        from tqdm import tqdm
+
         total = 0
-        if os.path.isdir(self.src):
-            for filepath in tqdm(
-                walkdir(self.src), unit="files", desc="Determining src size"
-            ):
-                total += os.stat(filepath).st_size
+        if self.stream_scan:
+            # the engine grows the total while it scans, and checks the free space
+            # once it has the full size
+            pass
+        elif os.path.isdir(self.src):
+            self._scan_src()
+            total = self.manifest.total_size
         else:
             total = os.stat(self.src).st_size
-        self.bar = tqdm(total=total, unit="B", unit_scale=True, unit_divisor=1024)
+        if self.reserve is not None and not self.stream_scan:
+            # fail before copying anything instead of when the disk is full
+            ensure_free_space(self.dst, total, self.reserve)
+        self.bar = tqdm(
+            total=total,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            file=self.output,
+        )
+        if self.throttle is not None and self.throttle.limited:
+            self.bar.set_postfix_str(self.throttle.describe(), refresh=False)
+
+    def _engine(
+        self,
+        workers,
+        buffer_size,
+        journal=None,
+        verify=None,
+        strategy=STRATEGY_AUTO,
+        small_file_size=DEFAULT_SMALL_FILE_SIZE,
+    ) -> CopyEngine:
+        self.engine = CopyEngine(
+            self.src,
+            self.dst,
+            self.bar,
+            workers,
+            buffer_size,
+            entries=self.manifest.entries if self.manifest else None,
+            grow_total=self.stream_scan,
+            journal=journal,
+            verify=verify,
+            strategy=strategy,
+            small_file_size=small_file_size,
+            throttle=self.throttle,
+            reserve=self.reserve if self.stream_scan else None,
+        )
+        return self.engine
+
+    def report(self):
+        """Prints the throughput of the copy engine, to compare the verify modes."""
+        if self.engine is None:
+            return
+        print(
+            f"Copied {format_size(self.engine.bytes_copied)}"
+            f" in {self.engine.seconds:.1f}s"
+            f" ({format_size(self.engine.throughput)}/s,"
+            f" verify: {self.engine.verify or 'off'})",
+            file=self.output,
+        )
 
     @staticmethod
-    def copy(src, dst, follow_symlinks=True):
-        p = CopyProgress(src, dst)
+    def copy(
+        src,
+        dst,
+        follow_symlinks=True,
+        workers=0,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        stream_scan=False,
+        expected_size=None,
+        reserve=None,
+        verify=None,
+        strategy=STRATEGY_AUTO,
+        small_file_size=DEFAULT_SMALL_FILE_SIZE,
+        output=None,
+        throttle=None,
+    ):
+        if verify or throttle is not None:
+            # only the engine verifies and throttles, shutil copies with sendfile
+            workers = workers or DEFAULT_WORKERS
+        # shutil needs the full size up front, only the engine can stream the scan
+        p = CopyProgress(
+            src,
+            dst,
+            stream_scan=stream_scan and workers > 0,
+            expected_size=expected_size,
+            reserve=reserve,
+            output=output,
+            throttle=throttle,
+        )
         try:
             shutil.copyfileobj = p.copyfileobj
-            if os.path.isdir(src):
-                dst = shutil.copytree(src, dst, symlinks=follow_symlinks)
+            if workers:
+                dst = p._engine(
+                    workers,
+                    buffer_size,
+                    verify=verify,
+                    strategy=strategy,
+                    small_file_size=small_file_size,
+                ).copy()
+            elif os.path.isdir(src):
+                with metrics.phase("copy_files"):
+                    dst = shutil.copytree(src, dst, symlinks=follow_symlinks)
             else:
-                dst = shutil.copy(src, dst, follow_symlinks=follow_symlinks)
+                with metrics.phase("copy_files"):
+                    dst = shutil.copy(src, dst, follow_symlinks=follow_symlinks)
         finally:
             shutil.copyfileobj = _orig_copyfileobj
             p.bar.close()
+        p.report()
 
         return dst
 
     @staticmethod
-    def move(src, dst):
-        p = CopyProgress(src, dst)
+    def move(
+        src,
+        dst,
+        workers=0,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        stream_scan=False,
+        expected_size=None,
+        reserve=None,
+        verify=None,
+        strategy=STRATEGY_AUTO,
+        small_file_size=DEFAULT_SMALL_FILE_SIZE,
+        output=None,
+        throttle=None,
+    ):
+        if verify or throttle is not None:
+            # only the engine verifies and throttles, shutil copies with sendfile
+            workers = workers or DEFAULT_WORKERS
+        journal = Journal.for_move(src, dst)
+        if journal.exists:
+            # only the engine can resume an interrupted move, and part of it is
+            # already on the destination, so the full size is not needed
+            workers = workers or DEFAULT_WORKERS
+            reserve = None
+        p = CopyProgress(
+            src,
+            dst,
+            stream_scan=stream_scan and workers > 0,
+            expected_size=expected_size,
+            reserve=reserve,
+            output=output,
+            throttle=throttle,
+        )
         try:
             shutil.copyfileobj = p.copyfileobj
-            dst = shutil.move(src, dst)
+            if workers:
+                dst = p._engine(
+                    workers, buffer_size, journal, verify, strategy, small_file_size
+                ).move()
+            else:
+                with metrics.phase("copy_files"):
+                    dst = shutil.move(src, dst)
         finally:
             shutil.copyfileobj = _orig_copyfileobj
             p.bar.close()
+        p.report()
 
         return dst
+
+    @staticmethod
+    def sync(
+        src,
+        dst,
+        workers=DEFAULT_WORKERS,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        compare_hashes=False,
+        remove_src=False,
+        reserve=None,
+        verify=None,
+        strategy=STRATEGY_AUTO,
+        small_file_size=DEFAULT_SMALL_FILE_SIZE,
+        output=None,
+        throttle=None,
+    ) -> ManifestDiff:
+        """Updates the existing copy in dst, only copying files that changed."""
+        from tqdm import tqdm
+
+        p = CopyProgress(src, dst, output=output, throttle=throttle)
+        try:
+            with metrics.phase("compare_dst"):
+                dst_manifest = Manifest(dst)
+                for _ in tqdm(
+                    dst_manifest.scan(), unit="files", desc="Comparing dst", file=output
+                ):
+                    pass
+                diff = diff_manifests(
+                    p.manifest,
+                    dst_manifest,
+                    same_content=is_same_content if compare_hashes else None,
+                )
+            if reserve is not None:
+                ensure_free_space(dst, diff.changed_size, reserve)
+            p.bar.reset(total=diff.changed_size)
+            engine = p._engine(
+                workers or DEFAULT_WORKERS,
+                buffer_size,
+                verify=verify,
+                strategy=strategy,
+                small_file_size=small_file_size,
+            )
+            engine.sync(diff)
+        finally:
+            p.bar.close()
+        p.report()
+        if remove_src:
+            with metrics.phase("remove_src"):
+                shutil.rmtree(src)
+        return diff
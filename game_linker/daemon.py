@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from game_linker.client import DEFAULT_PORT
+from game_linker.client import HOST
+from game_linker.config import GameLinkerConfig
+from game_linker.linker import GameLinker
+from game_linker.scheduler import JobResult
+from game_linker.scheduler import MoveJob
+from game_linker.scheduler import run_job
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobOutput:
+    """The progress bars and messages of a job, kept so it can be tailed later.
+
+    The copy threads write to it, the writes are handed to the event loop,
+    which wakes up the clients tailing the job.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.chunks: List[str] = []
+        self.closed = False
+        self._waiters: List[asyncio.Future] = []
+
+    def write(self, text: str) -> int:
+        self._loop.call_soon_threadsafe(self._append, text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def _append(self, text: str):
+        self.chunks.append(text)
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    async def wait(self, seen: int):
+        """Waits for more than seen chunks, or for the job to finish."""
+        if len(self.chunks) > seen or self.closed:
+            return
+        waiter = self._loop.create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+
+class DaemonJob:
+    def __init__(
+        self, job_id: int, linker: GameLinker, not_before: float, output: JobOutput
+    ):
+        self.id = job_id
+        self.linker = linker
+        self.not_before = not_before
+        self.output = output
+        self.state = JOB_QUEUED
+        self.result: Optional[JobResult] = None
+        linker.output = output
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "platform": self.linker.platform,
+            "game": self.linker.game,
+            "reverse": self.linker.reverse,
+            "not_before": self.not_before,
+            "state": self.state,
+            "error": self.result.error if self.result is not None else None,
+            "seconds": self.result.seconds if self.result is not None else None,
+        }
+
+
+class LinkDaemon:
+    """Links the games queued by clients, keeping the config and index loaded.
+
+    Like a batch, jobs reading from the same drive run one after another while
+    the drives run in parallel. A job waiting for its start time holds up the
+    jobs queued after it on its drive. The copies run on worker threads, so the
+    event loop keeps answering clients while games are moved.
+    """
+
+    def __init__(self, config: GameLinkerConfig):
+        self.config = config
+        self.jobs: Dict[int, DaemonJob] = {}
+        self._lanes: Dict[int, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _find_game(self, platform: str, game: str, reverse: bool) -> str:
+        """The game folder named by a client, which must be a game of the platform.
+
+        Any local process can queue a job, so a name like ../.. must never move
+        a folder outside the library.
+        """
+        if not game:
+            raise ValueError("No game given")
+        separators = [sep for sep in [os.sep, os.altsep] if sep]
+        if game in [".", ".."] or any(sep in game for sep in separators):
+            raise ValueError(f"{game} is not a game folder name")
+        for name in self.config.get_games(platform, reverse):
+            if name.lower() == game.lower():
+                return name
+        action = "unlink" if reverse else "link"
+        raise ValueError(f"No game {game} to {action} in {platform}")
+
+    def _make_linker(
+        self, platform: str, game: str, reverse: bool
+    ) -> Tuple[GameLinker, int]:
+        """The linker of a queued game and the drive it reads from."""
+        if platform not in self.config.config:
+            raise ValueError(f"{platform} not in config file")
+        error = self.config.get_platform_error(platform)
+        if error:
+            raise ValueError(error)
+        game = self._find_game(platform, game, reverse)
+        linker = GameLinker(self.config, platform, game, reverse=reverse)
+        linker.fix_paths()
+        if not os.path.exists(linker.read_path):
+            raise ValueError(f"{linker.read_path} does not exist")
+        return linker, os.stat(linker.read_path).st_dev
+
+    async def add_job(
+        self, platform: str, game: str, reverse: bool, not_before: float = 0
+    ) -> DaemonJob:
+        # finding the game scans the drives, which may be slow or asleep, so it
+        # runs on a worker thread like the copies
+        linker, drive = await self._loop.run_in_executor(
+            None, self._make_linker, platform, game, reverse
+        )
+        job = DaemonJob(len(self.jobs) + 1, linker, not_before, JobOutput(self._loop))
+        self.jobs[job.id] = job
+        lane = self._lanes.get(drive)
+        if lane is None:
+            lane = self._lanes[drive] = asyncio.Queue()
+            self._tasks.append(self._loop.create_task(self._run_lane(lane)))
+        lane.put_nowait(job)
+        return job
+
+    async def _run_job(self, job: DaemonJob):
+        delay = job.not_before - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        job.state = JOB_RUNNING
+        move_job = MoveJob(str(job.id), job.linker.execute, job.linker.read_path, 0)
+        job.result = await self._loop.run_in_executor(None, run_job, move_job)
+        job.state = JOB_FAILED if job.result.error is not None else JOB_DONE
+        job.output.close()
+        print(f"Job {job.id} {job.state}: [{job.linker.platform}] {job.linker.game}")
+
+    async def _run_lane(self, lane: asyncio.Queue):
+        while True:
+            job = await lane.get()
+            await self._run_job(job)
+
+    async def _send(self, writer: asyncio.StreamWriter, response: dict):
+        writer.write(f"{json.dumps(response)}\n".encode("utf-8"))
+        await writer.drain()
+
+    def _get_job(self, request: dict) -> DaemonJob:
+        job = self.jobs.get(request.get("job"))
+        if job is None:
+            raise ValueError(f"No job {request.get('job')}")
+        return job
+
+    async def _tail(self, writer: asyncio.StreamWriter, job: DaemonJob):
+        sent = 0
+        while True:
+            await job.output.wait(sent)
+            if len(job.output.chunks) > sent:
+                await self._send(writer, {"output": "".join(job.output.chunks[sent:])})
+                sent = len(job.output.chunks)
+            elif job.output.closed:
+                break
+        await self._send(writer, {"job": job.to_json()})
+
+    async def _handle(self, request: dict, writer: asyncio.StreamWriter):
+        command = request.get("command")
+        if command == "link":
+            job = await self.add_job(
+                request["platform"],
+                request["game"],
+                bool(request.get("reverse")),
+                request.get("not_before") or 0,
+            )
+            await self._send(writer, {"job": job.to_json()})
+        elif command == "jobs":
+            jobs = [job.to_json() for job in self.jobs.values()]
+            await self._send(writer, {"jobs": jobs})
+        elif command == "tail":
+            await self._tail(writer, self._get_job(request))
+        elif command == "throttle":
+            # the running copies pick up the new limits on their next chunk
+            self.config.throttle.set_limits(
+                request.get("bytes_per_second"), request.get("files_per_second")
+            )
+            limits = self.config.throttle.describe() or "no limit"
+            await self._send(writer, {"throttle": limits})
+        else:
+            raise ValueError(f"Unknown command {command}")
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            request = json.loads(await reader.readline())
+            await self._handle(request, writer)
+        except ConnectionError:
+            # the client stopped tailing a job
+            pass
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            await self._send(writer, {"error": str(e)})
+        finally:
+            writer.close()
+
+    async def serve(self, port: int = DEFAULT_PORT):
+        self._loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self._handle_client, HOST, port)
+        print(f"Waiting for jobs on {HOST}:{port}, queue them with --queue")
+        async with server:
+            await server.serve_forever()
+
+
+def serve(config: GameLinkerConfig):
+    daemon = LinkDaemon(config)
+    try:
+        asyncio.run(daemon.serve(config.daemon_port or DEFAULT_PORT))
+    except KeyboardInterrupt:
+        print("Stopped")
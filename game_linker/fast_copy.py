@@ -0,0 +1,231 @@
+import contextlib
+import errno
+import functools
+import os
+import sys
+from typing import Callable
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # not on unix
+    fcntl = None
+
+STRATEGY_AUTO = "auto"
+STRATEGY_REFLINK = "reflink"
+STRATEGY_COPY_FILE_RANGE = "copy_file_range"
+STRATEGY_SENDFILE = "sendfile"
+STRATEGY_READINTO = "readinto"
+COPY_STRATEGIES = [
+    STRATEGY_AUTO,
+    STRATEGY_REFLINK,
+    STRATEGY_COPY_FILE_RANGE,
+    STRATEGY_SENDFILE,
+    STRATEGY_READINTO,
+]
+
+# from linux/fs.h
+_FICLONE = 0x40049409
+# from the FILE_INFO_BY_HANDLE_CLASS enum in winbase.h
+_FILE_ALLOCATION_INFO = 5
+
+# errors meaning the kernel cannot do this copy, rather than that it failed
+_UNSUPPORTED_ERRORS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EBADF,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+}
+
+Progress = Callable[[int], None]
+
+
+def _is_unsupported(error: OSError) -> bool:
+    return error.errno in _UNSUPPORTED_ERRORS
+
+
+def reflink(fsrc, fdst) -> bool:
+    """Clones the file on filesystems that share blocks between files (btrfs, xfs)."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError as e:
+        if _is_unsupported(e) or e.errno == errno.EPERM:
+            return False
+        raise
+    return True
+
+
+def _get_windows_allocate() -> Callable[[int, int], None]:
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    set_info = kernel32.SetFileInformationByHandle
+    set_info.argtypes = [
+        wintypes.HANDLE,
+        ctypes.c_int,
+        ctypes.c_void_p,
+        wintypes.DWORD,
+    ]
+    set_info.restype = wintypes.BOOL
+
+    def allocate(fd: int, size: int):
+        # FILE_ALLOCATION_INFO only holds the size, unlike extending the file with
+        # os.ftruncate it reserves the clusters without writing zeros to them
+        info = ctypes.c_int64(size)
+        handle = msvcrt.get_osfhandle(fd)
+        if not set_info(
+            handle, _FILE_ALLOCATION_INFO, ctypes.byref(info), ctypes.sizeof(info)
+        ):
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    return allocate
+
+
+@functools.lru_cache(maxsize=None)
+def _get_fallocate() -> Optional[Callable[[int, int], None]]:
+    if os.name == "nt":
+        return _get_windows_allocate()
+    # where the filesystem cannot allocate, e.g. ntfs-3g, os.posix_fallocate writes
+    # to every block instead, so the call of the kernel is used directly
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    fallocate = getattr(libc, "fallocate64", None) or getattr(libc, "fallocate", None)
+    if fallocate is None:
+        return None
+    fallocate.argtypes = [
+        ctypes.c_int,
+        ctypes.c_int,
+        ctypes.c_int64,
+        ctypes.c_int64,
+    ]
+
+    def allocate(fd: int, size: int):
+        if fallocate(fd, 0, 0, size) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    return allocate
+
+
+def preallocate(fdst, size: int) -> bool:
+    """Reserves the full size of the file before writing, so it is not fragmented."""
+    if size <= 0:
+        return False
+    allocate = _get_fallocate()
+    if allocate is None:
+        return False
+    try:
+        allocate(fdst.fileno(), size)
+    except OSError as e:
+        if _is_unsupported(e):
+            return False
+        # e.g. the drive is full, better to know before copying
+        raise
+    return True
+
+
+def _advise(f, advice_name: str):
+    advice = getattr(os, advice_name, None)
+    if advice is None:
+        return
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, advice)
+    except OSError:
+        # only a hint
+        pass
+
+
+def drop_from_cache(f):
+    """Hints that the pages of f are not needed again, once it has been copied."""
+    _advise(f, "POSIX_FADV_DONTNEED")
+
+
+@contextlib.contextmanager
+def sequential_copy(fsrc, fdst, size: int):
+    """Preallocates fdst and hints that both files are read or written in order.
+
+    Afterwards the pages of fsrc are dropped from the page cache, so moving a large
+    game does not push everything else out of it.
+    """
+    preallocated = preallocate(fdst, size)
+    _advise(fsrc, "POSIX_FADV_SEQUENTIAL")
+    _advise(fdst, "POSIX_FADV_SEQUENTIAL")
+    yield
+    if preallocated:
+        end = os.fstat(fsrc.fileno()).st_size
+        if end < size:
+            # the source shrank while it was copied, only that much was copied
+            fdst.flush()
+            os.ftruncate(fdst.fileno(), end)
+    drop_from_cache(fsrc)
+
+
+def _kernel_copy(copy_chunk, chunk_size: int, progress: Progress) -> bool:
+    copied = 0
+    while True:
+        try:
+            n = copy_chunk(copied, chunk_size)
+        except OSError as e:
+            if copied == 0 and _is_unsupported(e):
+                return False
+            raise
+        if n == 0:
+            return True
+        copied += n
+        progress(n)
+
+
+def copy_file_range(fsrc, fdst, chunk_size: int, progress: Progress) -> bool:
+    """Copies inside the kernel, network filesystems can even copy server side."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    src_fd = fsrc.fileno()
+    dst_fd = fdst.fileno()
+    return _kernel_copy(
+        lambda offset, count: os.copy_file_range(src_fd, dst_fd, count, offset, offset),
+        chunk_size,
+        progress,
+    )
+
+
+def sendfile(fsrc, fdst, chunk_size: int, progress: Progress) -> bool:
+    if not hasattr(os, "sendfile") or not sys.platform.startswith("linux"):
+        return False
+    src_fd = fsrc.fileno()
+    dst_fd = fdst.fileno()
+    return _kernel_copy(
+        lambda offset, count: os.sendfile(dst_fd, src_fd, offset, count),
+        chunk_size,
+        progress,
+    )
+
+
+def readinto(
+    fsrc,
+    fdst,
+    buffer: bytearray,
+    progress: Progress,
+    on_buffer: Callable[[bytes], None] = None,
+):
+    """Copies through a reused buffer, without allocating for every read."""
+    view = memoryview(buffer)
+    while True:
+        n = fsrc.readinto(view)
+        if not n:
+            break
+        chunk = view[:n]
+        fdst.write(chunk)
+        if on_buffer is not None:
+            # the buffer is reused for the next read, so hand over a copy
+            on_buffer(bytes(chunk))
+        progress(n)
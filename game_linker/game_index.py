@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from game_linker.sizes import get_dir_size
+from game_linker.util import is_link_stat
+
+INDEX_VERSION = 1
+
+
+class GameInfo(NamedTuple):
+    name: str
+    platform: str
+    location: str
+    path: str
+    linked: bool
+    size: Optional[int]
+    file_count: Optional[int]
+
+
+class GameIndex:
+    """Caches the game folders of every platform location in a json file.
+
+    A location is only rescanned when the mtime of its directory changes, which
+    happens whenever a game folder is added, removed or renamed in it. Sizes are
+    computed on demand and kept until the mtime of the game folder changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._platforms: Dict[str, Dict[str, dict]] = {}
+        self._dirty = False
+        # locations can be scanned from several threads at once
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # a broken index is rebuilt from scratch
+            return
+        if data.get("version") == INDEX_VERSION:
+            self._platforms = data.get("platforms", {})
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": INDEX_VERSION, "platforms": self._platforms}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def _scan_location(self, directory: str, dir_mtime: float, old: dict) -> dict:
+        old_games = old.get("games", {}) if old.get("dir") == directory else {}
+        games = {}
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                game_mtime = entry.stat().st_mtime
+                game = {
+                    "linked": is_link_stat(entry.stat(follow_symlinks=False)),
+                    "mtime": game_mtime,
+                    "size": None,
+                    "files": None,
+                }
+                old_game = old_games.get(entry.name)
+                if old_game and old_game["mtime"] == game_mtime:
+                    game["size"] = old_game["size"]
+                    game["files"] = old_game["files"]
+                games[entry.name] = game
+        return {"dir": directory, "mtime": dir_mtime, "games": games}
+
+    def _get_location(self, platform: str, location: str, directory: str) -> dict:
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            cached = self._platforms.get(platform, {}).get(location, {})
+        if cached.get("dir") != directory or cached.get("mtime") != dir_mtime:
+            # scan outside the lock, so a slow drive does not hold up the others
+            cached = self._scan_location(directory, dir_mtime, cached)
+            with self._lock:
+                self._platforms.setdefault(platform, {})[location] = cached
+                self._dirty = True
+        return cached
+
+    def _to_info(
+        self, platform: str, location: str, directory: str, name: str, game: dict
+    ) -> GameInfo:
+        return GameInfo(
+            name,
+            platform,
+            location,
+            os.path.join(directory, name),
+            game["linked"],
+            game["size"],
+            game["files"],
+        )
+
+    def get_games(self, platform: str, location: str, directory: str) -> List[GameInfo]:
+        cached = self._get_location(platform, location, directory)
+        return [
+            self._to_info(platform, location, directory, name, game)
+            for name, game in cached.get("games", {}).items()
+        ]
+
+    def get_cached_game(
+        self, platform: str, location: str, directory: str, name: str
+    ) -> Optional[GameInfo]:
+        """Gets a single game as last scanned, without touching the drive."""
+        with self._lock:
+            cached = self._platforms.get(platform, {}).get(location, {})
+            if cached.get("dir") != directory:
+                return None
+            game = cached.get("games", {}).get(name)
+            if game is None:
+                return None
+            return self._to_info(platform, location, directory, name, game)
+
+    def get_game(
+        self, platform: str, location: str, directory: str, name: str, size=False
+    ) -> Optional[GameInfo]:
+        """Gets a single game, computing its size first if asked and not cached."""
+        cached = self._get_location(platform, location, directory)
+        game = cached.get("games", {}).get(name)
+        if game is None:
+            return None
+        if size and game["size"] is None and not game["linked"]:
+            size = get_dir_size(os.path.join(directory, name))
+            with self._lock:
+                game["size"] = size.size
+                game["files"] = size.file_count
+                self._dirty = True
+        return self._to_info(platform, location, directory, name, game)
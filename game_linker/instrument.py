@@ -0,0 +1,239 @@
+import atexit
+import contextlib
+import heapq
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+
+SLOWEST_FILES = 10
+# per file throughput is only meaningful for files that take more than a few reads
+HISTOGRAM_MIN_SIZE = 1024 * 1024
+# upper bounds of the throughput buckets in MiB/s, the last one is open ended
+HISTOGRAM_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048]
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class Metrics:
+    """Collects timings, counters and the slowest files of a run.
+
+    Phases are named sections of the run, timed every time they are entered.
+    Phases entered by several copy threads at once add up their time, so they
+    can add up to more than the run took.
+
+    With a .jsonl log path every phase and copied file is written as a json
+    line as it happens, followed by the report. Any other path gets the report
+    as one json document. Nothing is recorded until start is called.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.log_path: Optional[str] = None
+        self._log: Optional[TextIO] = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._started = 0.0
+        self._start_time = ""
+        self.phases: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self._slowest: List[Tuple[float, str, int]] = []
+
+    def start(self, log_path: Optional[str] = None):
+        self._reset()
+        self.enabled = True
+        self.log_path = log_path
+        if log_path is not None and log_path.endswith(".jsonl"):
+            self._log = open(log_path, "w")
+        self._started = time.perf_counter()
+        self._start_time = datetime.now().isoformat(timespec="seconds")
+
+    def _write_event(self, event: dict):
+        # called with the lock held
+        if self._log is not None:
+            self._log.write(f"{json.dumps(event)}\n")
+
+    @contextlib.contextmanager
+    def _timed_phase(self, name: str, log: bool):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                phase = self.phases.setdefault(name, [0, 0.0, 0.0])
+                phase[0] += 1
+                phase[1] += seconds
+                phase[2] = max(phase[2], seconds)
+                if log:
+                    self._write_event(
+                        {"event": "phase", "name": name, "seconds": seconds}
+                    )
+
+    def phase(self, name: str, log: bool = True):
+        """Times the with block, phases inside every file copy should not log."""
+        if not self.enabled:
+            return _NO_PHASE
+        return self._timed_phase(name, log)
+
+    def add(self, counter: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def add_file(self, path: str, size: int, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters["files"] = self.counters.get("files", 0) + 1
+            self.counters["bytes"] = self.counters.get("bytes", 0) + size
+            if size >= HISTOGRAM_MIN_SIZE and seconds > 0:
+                mib_per_second = size / seconds / (1024 * 1024)
+                bucket = 0
+                while (
+                    bucket < len(HISTOGRAM_BUCKETS)
+                    and mib_per_second >= HISTOGRAM_BUCKETS[bucket]
+                ):
+                    bucket += 1
+                self.histogram[bucket] += 1
+            slow_file = (seconds, path, size)
+            if len(self._slowest) < SLOWEST_FILES:
+                heapq.heappush(self._slowest, slow_file)
+            else:
+                heapq.heappushpop(self._slowest, slow_file)
+            self._write_event(
+                {"event": "file", "path": path, "size": size, "seconds": seconds}
+            )
+
+    def _histogram_labels(self) -> List[str]:
+        labels = []
+        lower = 0
+        for upper in HISTOGRAM_BUCKETS:
+            labels.append(f"{lower}-{upper}")
+            lower = upper
+        labels.append(f"{lower}+")
+        return labels
+
+    def report(self) -> dict:
+        with self._lock:
+            seconds = time.perf_counter() - self._started
+            return {
+                "started": self._start_time,
+                "seconds": seconds,
+                "phases": {
+                    name: {"count": count, "seconds": total, "max": longest}
+                    for name, (count, total, longest) in self.phases.items()
+                },
+                "counters": dict(self.counters),
+                "throughput_mib_per_second": dict(
+                    zip(self._histogram_labels(), self.histogram)
+                ),
+                "slowest_files": [
+                    {"path": path, "size": size, "seconds": file_seconds}
+                    for file_seconds, path, size in sorted(self._slowest, reverse=True)
+                ],
+            }
+
+    def stop(self):
+        """Writes the report and stops recording."""
+        if not self.enabled:
+            return
+        report = self.report()
+        with self._lock:
+            if self._log is not None:
+                self._write_event({"event": "report", **report})
+                self._log.close()
+                self._log = None
+            elif self.log_path is not None:
+                with open(self.log_path, "w") as f:
+                    json.dump(report, f, indent=2)
+            self.enabled = False
+
+
+metrics = Metrics()
+
+
+class Profiler:
+    """Runs cProfile from start to stop and writes the stats file pstats reads.
+
+    Before Python 3.12 cProfile only sees the thread it is enabled in, while
+    the copies, hashes and scans run on worker threads. Every thread started
+    while profiling then gets its own profile, and they are all merged into the
+    stats file. From 3.12 one profile sees every thread, and only one can be
+    enabled at a time.
+    """
+
+    def __init__(self, path: str):
+        import cProfile
+
+        self.path = path
+        self._profile = cProfile.Profile()
+        self._thread_profiles: List["cProfile.Profile"] = []
+        self._lock = threading.Lock()
+
+    def _profile_thread(self, frame, event, arg):
+        import cProfile
+
+        # called once as a new thread starts, its own profile replaces this hook
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+        except Exception:
+            # the thread runs without a profile rather than dying before its work
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._thread_profiles.append(profile)
+
+    def start(self):
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+        self._profile.enable()
+
+    def stop(self):
+        import pstats
+
+        self._profile.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                profile.disable()
+                profile.create_stats()
+                # pstats refuses a profile that saw no calls
+                if profile.stats:
+                    stats.add(profile)
+        stats.dump_stats(self.path)
+
+
+_profiler: Optional[Profiler] = None
+
+
+def start(report_path: Optional[str] = None, profile_path: Optional[str] = None):
+    """Starts recording metrics and profiling, until the process exits."""
+    global _profiler
+    if report_path is not None:
+        metrics.start(report_path)
+    if profile_path is not None:
+        _profiler = Profiler(profile_path)
+        _profiler.start()
+    # the linker exits from many places, this writes the results either way
+    atexit.register(stop)
+
+
+def stop():
+    global _profiler
+    metrics.stop()
+    if _profiler is not None:
+        _profiler.stop()
+        _profiler = None
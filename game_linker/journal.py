@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from game_linker.manifest import ManifestEntry
+from game_linker.manifest import MTIME_TOLERANCE
+
+# copied files are flushed to disk and recorded together once either is reached
+SYNC_FILES = 64
+SYNC_BYTES = 64 * 1024 * 1024
+
+
+def _sync_path(path: str):
+    # windows only flushes files that are open for writing
+    fd = os.open(path, os.O_RDWR if os.name == "nt" else os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Records every file a move has finished copying, so it can be resumed.
+
+    The journal is a json lines file next to the destination folder. The first
+    line names the source, each following line is a copied file. It is deleted
+    once the source has been removed.
+
+    A file is only recorded once its data is on disk, after a power loss the
+    size and times of a file can survive while its data does not. The files are
+    flushed in batches, and the journal right after them.
+    """
+
+    def __init__(self, path: str, src: str):
+        self.path = path
+        self.src = os.path.normpath(src)
+        self._done: Dict[str, dict] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        # records waiting for their batch to be synced, with the file to flush
+        self._pending: List[Tuple[dict, Optional[str]]] = []
+        self._pending_size = 0
+
+    @staticmethod
+    def path_for(dst: str) -> str:
+        dst = os.path.normpath(dst)
+        return os.path.join(
+            os.path.dirname(dst), f".{os.path.basename(dst)}.gamelinker-journal"
+        )
+
+    @classmethod
+    def for_move(cls, src: str, dst: str) -> "Journal":
+        return cls(cls.path_for(dst), src)
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> bool:
+        """Loads the finished files, returns whether there is a move to resume."""
+        if not self.exists:
+            return False
+        with open(self.path, "r") as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return False
+        if os.path.normpath(header.get("src", "")) != self.src:
+            return False
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line is cut short if the move was killed while writing it
+                continue
+            self._done[record["path"]] = record
+        return True
+
+    def is_done(self, entry: ManifestEntry, dst: str) -> bool:
+        """Checks the file was copied and neither side has changed since."""
+        record = self._done.get(entry.path)
+        if record is None:
+            return False
+        if record["size"] != entry.size or record["mtime"] != entry.mtime:
+            return False
+        try:
+            stat = os.stat(dst)
+        except FileNotFoundError:
+            return False
+        return (
+            stat.st_size == entry.size
+            and abs(stat.st_mtime - entry.mtime) <= MTIME_TOLERANCE
+        )
+
+    def open(self, resume: bool):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w")
+        if not resume:
+            self._write({"src": self.src})
+
+    def _write(self, record: dict):
+        self._file.write(f"{json.dumps(record)}\n")
+        self._file.flush()
+
+    def _sync_pending(self):
+        for _, dst in self._pending:
+            if dst is not None:
+                _sync_path(dst)
+        for record, _ in self._pending:
+            self._file.write(f"{json.dumps(record)}\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = []
+        self._pending_size = 0
+
+    def record(
+        self,
+        entry: ManifestEntry,
+        dst: str,
+        file_hash: Optional[str] = None,
+        synced: bool = False,
+    ):
+        """Records the copy of entry in dst, synced if it is already on disk."""
+        record = {"path": entry.path, "size": entry.size, "mtime": entry.mtime}
+        if file_hash is not None:
+            record["hash"] = file_hash
+        with self._lock:
+            self._pending.append((record, None if synced else dst))
+            self._pending_size += entry.size
+            if len(self._pending) >= SYNC_FILES or self._pending_size >= SYNC_BYTES:
+                self._sync_pending()
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                # also after a failed copy, so a resume skips what was copied
+                self._sync_pending()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if self.exists:
+            os.remove(self.path)
@@ -1,24 +1,64 @@
-import _winapi
+import errno
+import fnmatch
+import functools
 import os
 import sys
+import time
+from typing import List
+from typing import Optional
+from typing import TextIO
 
+from game_linker.audit import LinkAuditor
+from game_linker.audit import PROBLEM_STATES
+from game_linker.audit import REPAIRABLE_STATES
+from game_linker.audit import repair
 from game_linker.choice_prompter import ChoicePrompter
 from game_linker.config import GameLinkerConfig
 from game_linker.copy_progress import CopyProgress
+from game_linker.instrument import metrics
+from game_linker.journal import Journal
+from game_linker.planner import TieringPlanner
+from game_linker.scheduler import JobResult
+from game_linker.scheduler import MoveJob
+from game_linker.scheduler import MoveScheduler
 from game_linker.util import ask_yes_no
+from game_linker.util import create_link
 from game_linker.util import fix_path_case
+from game_linker.util import format_size
+from game_linker.util import is_link
+from game_linker.util import is_same_volume
+from game_linker.util import remove_link
 
 
 class GameLinker:
-    def __init__(self, config: GameLinkerConfig):
+    def __init__(
+        self,
+        config: GameLinkerConfig,
+        platform: Optional[str] = None,
+        game: Optional[str] = None,
+        reverse: Optional[bool] = None,
+    ):
         self.config = config
-        self.source_dir = self.config.source_dir
-        self.source_path = self.config.source_path
-        self.target_dir = self.config.target_dir
-        self.target_path = self.config.target_path
-        self.game = self.config.game
+        self.platform = platform or self.config.platform
+        self.reverse = self.config.reverse if reverse is None else reverse
+        self.game = self.config.game if game is None else game
+        self.source_dir = self.config.get_platform_dir(self.platform, config.source)
+        self.source_path = os.path.join(self.source_dir, self.game)
+        self.target_dir = self.config.get_platform_dir(self.platform, config.target)
+        self.target_path = os.path.join(self.target_dir, self.game)
+        # the progress and messages of execute go to stdout and stderr unless set
+        self.output: Optional[TextIO] = None
+
+    @property
+    def read_path(self) -> str:
+        """The game folder that gets copied."""
+        return self.target_path if self.reverse else self.source_path
 
     def fix_paths(self):
+        with metrics.phase("fix_path_case"):
+            self._fix_paths()
+
+    def _fix_paths(self):
         if os.path.exists(self.source_dir):
             self.source_dir = fix_path_case(self.source_dir)
         if os.path.exists(self.target_dir):
@@ -48,22 +88,68 @@ class GameLinker:
         games = self.config.games
         if not games:
             if self.config.game:
-                sys.exit(f'No games found containing "{self.config.game}"')
+                sys.exit(f'No games found matching "{self.config.game}"')
             else:
                 sys.exit(f'No games found for "{self.config.platform}" platform')
         if len(games) == 1:
             return games[0]
 
         if self.config.game:
-            print(f'Found {len(games)} games containing "{self.config.game}"')
+            print(f'Found {len(games)} games matching "{self.config.game}"')
         else:
             print(f'Found {len(games)} games for "{self.config.platform}" platform')
 
-        prompter = ChoicePrompter("What game? ", games, 10)
+        prompter = ChoicePrompter(
+            "What game? ",
+            games,
+            10,
+            describe=functools.partial(self.config.describe_game, self.platform),
+        )
         game = prompter.choose()
+        if self.config.index is not None:
+            # keeps the locations scanned for the prompt
+            self.config.index.save()
         return game
 
-    def link(self):
+    def _get_cached_size(self, path: str) -> Optional[int]:
+        """The size of the game folder if the index already knows it."""
+        if self.config.index is None:
+            return None
+        if path == self.target_path:
+            location, directory = self.config.target, self.target_dir
+        else:
+            location, directory = self.config.source, self.source_dir
+        info = self.config.index.get_game(
+            self.platform, location, directory, os.path.basename(path)
+        )
+        return info.size if info is not None else None
+
+    def _move(self, src: str, dst: str):
+        resume = Journal.for_move(src, dst).exists
+        if not resume and is_same_volume(src, os.path.dirname(dst)):
+            # a rename on the same volume is instant, no need to size or copy the tree
+            with metrics.phase("rename"):
+                os.rename(src, dst)
+            print(f"Renamed (same volume): {src} ==> {dst}", file=self.output)
+            return
+        CopyProgress.move(
+            src,
+            dst,
+            workers=self.config.workers,
+            buffer_size=self.config.buffer_size,
+            stream_scan=self.config.stream_scan,
+            expected_size=self._get_cached_size(src),
+            reserve=self.config.reserve,
+            verify=self.config.verify,
+            strategy=self.config.copy_strategy,
+            small_file_size=self.config.small_file_size,
+            output=self.output,
+            throttle=self.config.throttle,
+        )
+        print(f"Copied (different volumes): {src} ==> {dst}", file=self.output)
+
+    def prepare(self):
+        """Picks the game and asks before linking it, execute does the rest."""
         if self.config.create_dirs:
             if not os.path.exists(self.config.source_dir):
                 os.makedirs(self.config.source_dir)
@@ -74,43 +160,291 @@ class GameLinker:
         if not self.game:
             sys.exit("no game to link")
         self.fix_paths()
-        link_msg = "unlink" if self.config.reverse else "link"
+        link_msg = "unlink" if self.reverse else "link"
         if not ask_yes_no(
             f'Are you sure you want to {link_msg} "{self.game}"', default="n"
         ):
             sys.exit("Exiting...")
 
+    def link(self):
+        self.prepare()
+        try:
+            with metrics.phase("execute"):
+                self.execute()
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                raise
+            sys.exit(f"{e.strerror}: {e.filename}")
+
+    def _copy(self, src: str, dst: str):
+        CopyProgress.copy(
+            src,
+            dst,
+            workers=self.config.workers,
+            buffer_size=self.config.buffer_size,
+            stream_scan=self.config.stream_scan,
+            expected_size=self._get_cached_size(src),
+            reserve=self.config.reserve,
+            verify=self.config.verify,
+            strategy=self.config.copy_strategy,
+            small_file_size=self.config.small_file_size,
+            output=self.output,
+            throttle=self.config.throttle,
+        )
+        print(f"Copied (keeping source): {src} ==> {dst}", file=self.output)
+
+    def _sync(self, src: str, dst: str):
+        diff = CopyProgress.sync(
+            src,
+            dst,
+            workers=self.config.workers,
+            buffer_size=self.config.buffer_size,
+            compare_hashes=self.config.sync_hash,
+            remove_src=True,
+            reserve=self.config.reserve,
+            verify=self.config.verify,
+            strategy=self.config.copy_strategy,
+            small_file_size=self.config.small_file_size,
+            output=self.output,
+            throttle=self.config.throttle,
+        )
+        changed = sum(1 for entry in diff.changed if not entry.is_dir)
+        print(
+            f"Synced: {changed} files changed ({format_size(diff.changed_size)}),"
+            f" {len(diff.orphans)} removed,"
+            f" {format_size(diff.unchanged_size)} unchanged: {src} ==> {dst}",
+            file=self.output,
+        )
+
+    def _resume_move(self) -> bool:
+        """Finishes a move that was interrupted, returns whether there was one."""
+        if self.reverse:
+            src, dst = self.target_path, self.source_path
+        else:
+            src, dst = self.source_path, self.target_path
+        journal = Journal.for_move(src, dst)
+        if not journal.exists:
+            return False
+        if not os.path.exists(src):
+            # the move only got as far as removing the source
+            journal.remove()
+            return False
+        print(f"Resuming interrupted move: {src} ==> {dst}", file=self.output)
+        self._move(src, dst)
+        return True
+
+    def _unlink_move(self):
+        if self.config.sync:
+            # keeps the copy in the target, so linking again only syncs the changes
+            self._copy(self.target_path, self.source_path)
+        else:
+            self._move(self.target_path, self.source_path)
+        print(
+            f"Junction removed: {self.source_path} <== {self.target_path}",
+            file=self.output,
+        )
+
+    def execute(self):
+        resumed = self._resume_move()
         source_exists = os.path.exists(self.source_path)
         target_exists = os.path.exists(self.target_path)
 
         if not source_exists and not target_exists:
             sys.exit("Game folder does not exist in either location")
-        if self.config.reverse:
-            if source_exists and target_exists:
-                # this remove directory will fail if not a link, unless the directory is empty
-                # if the dir is empty, then it's not a big deal if the directory is accidentally deleted
-                os.rmdir(self.source_path)
-                CopyProgress.move(self.target_path, self.source_path)
-                print(f"Junction removed: {self.source_path} <== {self.target_path}")
+        if self.reverse:
+            if resumed:
+                print(
+                    f"Junction removed: {self.source_path} <== {self.target_path}",
+                    file=self.output,
+                )
+            elif source_exists and target_exists:
+                if is_link(self.source_path):
+                    remove_link(self.source_path)
+                else:
+                    # this remove directory will fail unless the directory is empty
+                    # if the dir is empty, then it's not a big deal if the directory is accidentally deleted
+                    os.rmdir(self.source_path)
+                self._unlink_move()
             elif not target_exists:
                 sys.exit("Target does not exist")
             else:
-                CopyProgress.move(self.target_path, self.source_path)
-                print(f"Junction removed: {self.source_path} <== {self.target_path}")
+                self._unlink_move()
         else:
             if source_exists and target_exists:
-                sys.exit("Game folder exists in both locations")
+                if not self.config.sync or is_link(self.source_path):
+                    sys.exit("Game folder exists in both locations")
+                self._sync(self.source_path, self.target_path)
             elif source_exists:
                 if not os.path.isdir(self.source_path):
                     sys.exit(f"{self.source_path} is not a directory")
-                CopyProgress.move(self.source_path, self.target_path)
+                self._move(self.source_path, self.target_path)
             if not os.path.isdir(self.target_path):
                 sys.exit(f"{self.target_path} is not a directory")
-            _winapi.CreateJunction(self.target_path, self.source_path)
-            print(f"Junction created: {self.source_path} ==> {self.target_path}")
+            with metrics.phase("create_junction"):
+                create_link(self.target_path, self.source_path)
+            print(
+                f"Junction created: {self.source_path} ==> {self.target_path}",
+                file=self.output,
+            )
+
+
+def _matches_batch(config: GameLinkerConfig, game: str) -> bool:
+    game = game.lower()
+    return any(fnmatch.fnmatch(game, p.lower()) for p in config.batch_patterns)
+
+
+def plan_batch(config: GameLinkerConfig) -> List[GameLinker]:
+    if config.platform:
+        all_games = {config.platform: config.games}
+    else:
+        platforms = sorted(config.config, key=lambda p: p.lower())
+        all_games = config.get_all_games(platforms)
+    linkers = []
+    for platform, games in all_games.items():
+        for game in games:
+            if _matches_batch(config, game):
+                linker = GameLinker(config, platform, game)
+                linker.fix_paths()
+                linkers.append(linker)
+    return linkers
+
+
+def _print_batch_summary(results: List[JobResult]):
+    print("Summary:")
+    for result in results:
+        if result.error is not None:
+            print(f"  {result.name}: failed ({result.error})")
+        else:
+            print(
+                f"  {result.name}: {format_size(result.size)} in {result.seconds:.1f}s"
+                f" ({format_size(result.throughput)}/s)"
+            )
+    failed = sum(1 for result in results if result.error is not None)
+    print(f"{len(results) - failed} moved, {failed} failed")
+
+
+def link_batch(config: GameLinkerConfig):
+    linkers = plan_batch(config)
+    if not linkers:
+        sys.exit("No games found matching the batch")
+    read_location = config.target if config.reverse else config.source
+    sizes = []
+    for linker in linkers:
+        size = config.get_game_size(linker.platform, read_location, linker.game)
+        sizes.append(size)
+        print(f"[{linker.platform}] {linker.game} - {format_size(size)}")
+
+    link_msg = "unlink" if config.reverse else "link"
+    if not ask_yes_no(
+        f"Are you sure you want to {link_msg} {len(linkers)} games"
+        f" ({format_size(sum(sizes))})",
+        default="n",
+    ):
+        sys.exit("Exiting...")
+    _print_batch_summary(_run_jobs(linkers, sizes))
+
+
+def _run_jobs(linkers: List[GameLinker], sizes: List[int]) -> List[JobResult]:
+    scheduler = MoveScheduler()
+    for linker, size in zip(linkers, sizes):
+        name = f"[{linker.platform}] {linker.game}"
+        scheduler.add(MoveJob(name, linker.execute, linker.read_path, size))
+    return scheduler.run()
+
+
+def plan_tiering(config: GameLinkerConfig):
+    if config.platform:
+        platforms = [config.platform]
+    else:
+        platforms = sorted(config.config, key=lambda p: p.lower())
+    plans = TieringPlanner(config).plan(platforms)
+    links = []
+    unlinks = []
+    for plan in plans:
+        print(", ".join(plan.target_dirs))
+        print(f"  {format_size(plan.used)} of {format_size(plan.budget)} budget used")
+        for action, candidates in [
+            ("link", plan.links),
+            ("unlink", plan.unlinks),
+            ("keep", plan.keeps),
+        ]:
+            for c in candidates:
+                print(f"  {action:<6} [{c.platform}] {c.name} - {format_size(c.size)}")
+        unlinks.extend(plan.unlinks)
+        links.extend(plan.links)
+    if not links and not unlinks:
+        print("Nothing to change")
+        return
+    if not ask_yes_no("Apply this plan", default="n"):
+        sys.exit("Exiting...")
+
+    # unlink first to free up the space for the links
+    for reverse, candidates in [(True, unlinks), (False, links)]:
+        linkers = []
+        for c in candidates:
+            linker = GameLinker(config, c.platform, c.name, reverse=reverse)
+            linker.fix_paths()
+            linkers.append(linker)
+        if linkers:
+            _print_batch_summary(_run_jobs(linkers, [c.size for c in candidates]))
+
+
+def audit_links(config: GameLinkerConfig):
+    if config.platform:
+        platforms = [config.platform]
+    else:
+        platforms = sorted(config.config, key=lambda p: p.lower())
+    start = time.perf_counter()
+    with metrics.phase("audit"):
+        statuses = LinkAuditor(config).audit(platforms)
+    seconds = time.perf_counter() - start
+    counts = {}
+    platform = None
+    for status in statuses:
+        counts[status.state] = counts.get(status.state, 0) + 1
+        if status.state not in PROBLEM_STATES:
+            continue
+        if status.platform != platform:
+            platform = status.platform
+            print(f"[{platform}]")
+        if status.link_target is not None:
+            detail = f"{status.source_path} -> {status.link_target}"
+        elif status.interrupted:
+            detail = "interrupted move, link it again to finish it"
+        else:
+            detail = status.target_path
+        print(f"  {status.name} - {status.state} - {detail}")
+    summary = ", ".join(f"{count} {state}" for state, count in sorted(counts.items()))
+    print(f"Audited {len(statuses)} games in {seconds:.2f}s: {summary or 'no games'}")
+
+    repairs = [s for s in statuses if s.state in REPAIRABLE_STATES]
+    if not repairs:
+        return
+    if not ask_yes_no(f"Repair {len(repairs)} broken or orphaned games", default="n"):
+        sys.exit("Exiting...")
+    for status in repairs:
+        try:
+            print(f"  [{status.platform}] {status.name}: {repair(status)}")
+        except OSError as e:
+            print(f"  [{status.platform}] {status.name}: failed ({e})")
+
+
+def list_games(config: GameLinkerConfig):
+    platforms = [config.platform] if config.platform else list(config.config)
+    for platform in sorted(platforms, key=lambda p: p.lower()):
+        games = config.get_game_infos(platform)
+        if not games:
+            continue
+        print(f"[{platform}]")
+        for game in games:
+            if game.linked:
+                size = "link"
+            else:
+                size = format_size(game.size)
+            print(f"  {game.name} - {size} - {game.location}")
 
 
 if __name__ == "__main__":
-    config = GameLinkerConfig()
-    linker = GameLinker(config)
-    linker.link()
+    from game_linker.cli import main
+
+    main()
@@ -0,0 +1,134 @@
+import os
+from typing import Callable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+# filesystems store mtimes with different precision, e.g. fat32 only has 2 seconds
+MTIME_TOLERANCE = 2.0
+
+
+class ManifestEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    is_dir: bool = False
+    is_link: bool = False
+    # only known on unix, where it comes with the directory listing, otherwise 0
+    inode: int = 0
+
+
+class Manifest:
+    """The files and dirs under root, relative to root, gathered in one scandir pass.
+
+    Dirs are always listed before anything inside them, so the entries can be
+    replayed in order to recreate the tree.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.entries: List[ManifestEntry] = []
+        self.total_size = 0
+        self.file_count = 0
+
+    def scan(self) -> Iterator[ManifestEntry]:
+        """Yields the entries as they are found, recording them along the way."""
+        self.entries = []
+        self.total_size = 0
+        self.file_count = 0
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                for dir_entry in it:
+                    entry = self._to_entry(rel_dir, dir_entry)
+                    if entry.is_dir:
+                        stack.append(entry.path)
+                    else:
+                        self.total_size += entry.size
+                        self.file_count += 1
+                    self.entries.append(entry)
+                    yield entry
+
+    def build(self) -> "Manifest":
+        for _ in self.scan():
+            pass
+        return self
+
+    @property
+    def files(self) -> List[ManifestEntry]:
+        return [entry for entry in self.entries if not entry.is_dir]
+
+    @staticmethod
+    def _to_entry(rel_dir: str, dir_entry: os.DirEntry) -> ManifestEntry:
+        path = os.path.join(rel_dir, dir_entry.name)
+        # on windows the stat result comes for free with the directory listing
+        stat = dir_entry.stat(follow_symlinks=False)
+        if dir_entry.is_symlink():
+            return ManifestEntry(path, 0, stat.st_mtime, is_link=True)
+        if dir_entry.is_dir(follow_symlinks=False):
+            return ManifestEntry(path, 0, stat.st_mtime, is_dir=True)
+        inode = dir_entry.inode() if os.name != "nt" else 0
+        return ManifestEntry(path, stat.st_size, stat.st_mtime, inode=inode)
+
+
+class ManifestDiff(NamedTuple):
+    # dirs and files to copy from the source, dirs first
+    changed: List[ManifestEntry]
+    # entries only in the destination, or whose type changed
+    orphans: List[ManifestEntry]
+    changed_size: int
+    unchanged_size: int
+
+
+def is_same_file(src: ManifestEntry, dst: ManifestEntry) -> bool:
+    return (
+        src.size == dst.size
+        and src.is_link == dst.is_link
+        and abs(src.mtime - dst.mtime) <= MTIME_TOLERANCE
+    )
+
+
+def diff_manifests(
+    src: Manifest,
+    dst: Manifest,
+    same_content: Optional[Callable[[str, str], bool]] = None,
+) -> ManifestDiff:
+    """Works out what to copy and delete to turn dst into a copy of src.
+
+    Files are compared by size and mtime. If same_content is given, files that
+    look the same are also compared with it, e.g. by hashing both of them.
+    """
+    dst_entries = {entry.path: entry for entry in dst.entries}
+    src_paths = set()
+    changed = []
+    orphans = []
+    changed_size = 0
+    unchanged_size = 0
+    for entry in src.entries:
+        src_paths.add(entry.path)
+        dst_entry = dst_entries.get(entry.path)
+        if dst_entry is not None and dst_entry.is_dir != entry.is_dir:
+            orphans.append(dst_entry)
+            dst_entry = None
+        if entry.is_dir:
+            changed.append(entry)
+        elif (
+            dst_entry is not None
+            and not entry.is_link
+            and is_same_file(entry, dst_entry)
+            and (
+                same_content is None
+                or same_content(
+                    os.path.join(src.root, entry.path),
+                    os.path.join(dst.root, entry.path),
+                )
+            )
+        ):
+            unchanged_size += entry.size
+        else:
+            changed.append(entry)
+            changed_size += entry.size
+    orphans.extend(entry for entry in dst.entries if entry.path not in src_paths)
+    return ManifestDiff(changed, orphans, changed_size, unchanged_size)
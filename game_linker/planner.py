@@ -0,0 +1,132 @@
+import os
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+
+from game_linker.config import GameLinkerConfig
+from game_linker.util import get_free_space
+
+
+class TierCandidate(NamedTuple):
+    platform: str
+    name: str
+    size: int
+    # whether the game is currently in the target location
+    linked: bool
+    priority: int
+    last_played: float
+
+
+class TieringPlan(NamedTuple):
+    target_dirs: List[str]
+    budget: int
+    used: int
+    links: List[TierCandidate]
+    unlinks: List[TierCandidate]
+    keeps: List[TierCandidate]
+
+
+def get_last_played(path: str) -> float:
+    """The latest access time of the game folder or the files directly in it."""
+    latest = os.stat(path).st_atime
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                latest = max(latest, entry.stat(follow_symlinks=False).st_atime)
+    return latest
+
+
+def plan_tier(
+    candidates: List[TierCandidate], budget: int, target_dirs: List[str]
+) -> TieringPlan:
+    """Picks the games that fit in the budget, highest priority and most recent first.
+
+    Games with a negative priority are never picked.
+    """
+    ranked = sorted(candidates, key=lambda c: (c.priority, c.last_played), reverse=True)
+    used = 0
+    links = []
+    unlinks = []
+    keeps = []
+    for candidate in ranked:
+        fits = candidate.priority >= 0 and used + candidate.size <= budget
+        if fits:
+            used += candidate.size
+            if candidate.linked:
+                keeps.append(candidate)
+            else:
+                links.append(candidate)
+        elif candidate.linked:
+            unlinks.append(candidate)
+    return TieringPlan(target_dirs, budget, used, links, unlinks, keeps)
+
+
+class TieringPlanner:
+    """Plans which games to keep in the target location of each platform.
+
+    Platforms whose target dirs are on the same drive share that drive's budget,
+    which is its free space plus the size of the games already on it, less the
+    reserved space.
+    """
+
+    def __init__(self, config: GameLinkerConfig):
+        self.config = config
+
+    def get_candidates(self, platform: str) -> List[TierCandidate]:
+        priorities = self.config.config[platform].priority
+        infos = self.config.get_game_infos(platform)
+        target_games = {
+            info.name: info for info in infos if info.location == self.config.target
+        }
+        candidates = []
+        for info in infos:
+            if info.location != self.config.source:
+                continue
+            if info.linked:
+                game = target_games.get(info.name)
+                if game is None:
+                    # the link is dangling
+                    continue
+            elif info.name in target_games:
+                # a copy in both locations, leave it to --sync
+                continue
+            else:
+                game = info
+            candidates.append(
+                TierCandidate(
+                    platform,
+                    info.name,
+                    game.size,
+                    info.linked,
+                    priorities.get(info.name.lower(), 0),
+                    get_last_played(game.path),
+                )
+            )
+        return candidates
+
+    def plan(self, platforms: List[str]) -> List[TieringPlan]:
+        drives: Dict[int, List[str]] = {}
+        for platform in platforms:
+            if self.config.get_platform_error(platform):
+                continue
+            target_dir = self.config.get_platform_dir(platform, self.config.target)
+            if not os.path.exists(target_dir):
+                continue
+            drives.setdefault(os.stat(target_dir).st_dev, []).append(platform)
+
+        plans = []
+        for drive_platforms in drives.values():
+            target_dirs = [
+                self.config.get_platform_dir(platform, self.config.target)
+                for platform in drive_platforms
+            ]
+            candidates = []
+            for platform in drive_platforms:
+                candidates.extend(self.get_candidates(platform))
+            budget = (
+                get_free_space(target_dirs[0])
+                + sum(c.size for c in candidates if c.linked)
+                - self.config.reserve
+            )
+            plans.append(plan_tier(candidates, max(budget, 0), target_dirs))
+        return plans
@@ -0,0 +1,64 @@
+import queue
+import threading
+import time
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+DEFAULT_SCAN_TIMEOUT = 10.0
+
+T = TypeVar("T")
+ScanJobs = Dict[Hashable, Callable[[], T]]
+
+
+def iter_concurrently(
+    jobs: ScanJobs, timeout: float = DEFAULT_SCAN_TIMEOUT
+) -> Iterator[Tuple[Hashable, Optional[T], Optional[str]]]:
+    """Runs every job in its own thread and yields (key, result, error) as each ends.
+
+    Jobs that fail or are still running once the timeout expires are yielded
+    last with an error message instead of a result. The threads are daemons, so
+    a drive that never responds cannot keep the process alive.
+    """
+    finished: queue.Queue = queue.Queue()
+
+    def run(key, job):
+        try:
+            finished.put((key, job(), None))
+        except Exception as e:
+            finished.put((key, None, str(e) or type(e).__name__))
+
+    for key, job in jobs.items():
+        threading.Thread(target=run, args=(key, job), daemon=True).start()
+
+    deadline = time.monotonic() + timeout
+    pending = set(jobs)
+    while pending:
+        try:
+            key, result, error = finished.get(
+                timeout=max(deadline - time.monotonic(), 0)
+            )
+        except queue.Empty:
+            break
+        pending.discard(key)
+        yield key, result, error
+    for key in pending:
+        yield key, None, f"no response after {timeout:g}s"
+
+
+def run_concurrently(
+    jobs: ScanJobs, timeout: float = DEFAULT_SCAN_TIMEOUT
+) -> Tuple[Dict[Hashable, T], Dict[Hashable, str]]:
+    """Runs every job concurrently and splits the outcomes into results and errors."""
+    results = {}
+    errors = {}
+    for key, result, error in iter_concurrently(jobs, timeout):
+        if error is None:
+            results[key] = result
+        else:
+            errors[key] = error
+    return results, errors
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+class MoveJob(NamedTuple):
+    name: str
+    run: Callable[[], None]
+    read_path: str
+    size: int
+
+
+class JobResult(NamedTuple):
+    name: str
+    size: int
+    seconds: float
+    error: Optional[str]
+
+    @property
+    def throughput(self) -> float:
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+def run_job(job: MoveJob) -> JobResult:
+    """Runs the job, a failure is reported in the result instead of raised."""
+    error = None
+    start = time.perf_counter()
+    try:
+        job.run()
+    except SystemExit as e:
+        # the linker exits with a message when a game cannot be moved
+        error = str(e.code)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    seconds = time.perf_counter() - start
+    return JobResult(job.name, job.size if error is None else 0, seconds, error)
+
+
+class MoveScheduler:
+    """Runs move jobs with one lane per drive they read from.
+
+    Jobs reading from the same drive run one after another, so they do not make
+    the disk seek back and forth, while the lanes run in parallel. Drives are
+    told apart by st_dev, so two partitions of one disk count as two drives.
+    """
+
+    def __init__(self):
+        self.lanes: Dict[int, List[Tuple[int, MoveJob]]] = {}
+        self._results: List[Optional[JobResult]] = []
+
+    def add(self, job: MoveJob):
+        drive = os.stat(job.read_path).st_dev
+        self.lanes.setdefault(drive, []).append((len(self._results), job))
+        self._results.append(None)
+
+    def _run_lane(self, jobs: List[Tuple[int, MoveJob]]):
+        for job_index, job in jobs:
+            self._results[job_index] = run_job(job)
+
+    def run(self) -> List[JobResult]:
+        """Runs every lane and returns the results in the order the jobs were added."""
+        threads = [
+            threading.Thread(target=self._run_lane, args=(jobs,))
+            for jobs in self.lanes.values()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return list(self._results)
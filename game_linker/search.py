@@ -0,0 +1,148 @@
+import re
+import unicodedata
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import List
+from typing import NamedTuple
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# roman numerals in titles are matched as numbers, e.g. "ff7" for Final Fantasy VII
+ROMAN_NUMERALS = {
+    "ii": "2",
+    "iii": "3",
+    "iv": "4",
+    "v": "5",
+    "vi": "6",
+    "vii": "7",
+    "viii": "8",
+    "ix": "9",
+    "x": "10",
+    "xi": "11",
+    "xii": "12",
+    "xiii": "13",
+}
+# the share of the trigrams of a query a name needs to count as a typo of it
+MIN_SIMILARITY = 0.4
+MIN_ACRONYM_PREFIX = 2
+
+SCORE_EXACT = 100
+SCORE_ACRONYM = 90
+SCORE_PREFIX = 80
+SCORE_ACRONYM_PREFIX = 75
+SCORE_SUBSTRING = 70
+SCORE_WORDS = 60
+# fuzzy matches score up to this, by how similar they are
+SCORE_SIMILAR = 50
+
+_NOT_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_words(name: str) -> List[str]:
+    """Lowercase words without accents, punctuation or roman numerals."""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(c for c in name if not unicodedata.combining(c))
+    name = name.lower()
+    return [ROMAN_NUMERALS.get(word, word) for word in _NOT_ALNUM.split(name) if word]
+
+
+def get_acronym(words: List[str]) -> str:
+    return "".join(word if word.isdigit() else word[0] for word in words)
+
+
+def get_trigrams(words: List[str]) -> Set[str]:
+    padded = f" {' '.join(words)} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchEntry(NamedTuple):
+    words: List[str]
+    # the name without spaces, so "halflife" finds Half-Life
+    compact: str
+    acronym: str
+
+
+class GameSearch(Generic[T]):
+    """Ranks choices by how well their name matches a query.
+
+    Names are normalized once, and indexed by trigram and by acronym prefix, so
+    a search only looks at choices that can match instead of every name. From
+    best to worst, a name matches exactly, by acronym ("rdr2"), by prefix,
+    anywhere, by the start of each word, or has most of the trigrams of the query
+    so it is likely a typo.
+    """
+
+    def __init__(self, choices: Sequence[T], key: Callable[[T], str] = str):
+        self.choices = choices
+        self.entries: List[SearchEntry] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        self._acronyms: Dict[str, List[int]] = {}
+        for n, choice in enumerate(choices):
+            words = normalize_words(key(choice))
+            entry = SearchEntry(words, "".join(words), get_acronym(words))
+            self.entries.append(entry)
+            for trigram in get_trigrams(words):
+                self._trigrams.setdefault(trigram, []).append(n)
+            for end in range(MIN_ACRONYM_PREFIX, len(entry.acronym) + 1):
+                self._acronyms.setdefault(entry.acronym[:end], []).append(n)
+
+    def _candidates(self, compact: str, trigrams: Set[str]) -> Dict[int, int]:
+        """Counts the trigrams each choice shares with the query."""
+        if len(compact) < 3:
+            # too short for trigrams, but short queries only match a few names
+            return {
+                n: 0 for n, entry in enumerate(self.entries) if compact in entry.compact
+            }
+        shared: Dict[int, int] = {}
+        for trigram in trigrams:
+            for n in self._trigrams.get(trigram, []):
+                shared[n] = shared.get(n, 0) + 1
+        for n in self._acronyms.get(compact, []):
+            shared.setdefault(n, 0)
+        return shared
+
+    def _score(
+        self, entry: SearchEntry, words: List[str], compact: str, similarity: float
+    ) -> float:
+        if entry.compact == compact:
+            return SCORE_EXACT
+        if entry.acronym == compact:
+            return SCORE_ACRONYM
+        if entry.compact.startswith(compact):
+            return SCORE_PREFIX
+        if len(compact) >= MIN_ACRONYM_PREFIX and entry.acronym.startswith(compact):
+            return SCORE_ACRONYM_PREFIX
+        if compact in entry.compact:
+            return SCORE_SUBSTRING
+        if all(
+            any(name_word.startswith(word) for name_word in entry.words)
+            for word in words
+        ):
+            return SCORE_WORDS
+        if similarity >= MIN_SIMILARITY:
+            return SCORE_SIMILAR * similarity
+        return 0
+
+    def search(self, query: str) -> List[T]:
+        """The matching choices, best match first."""
+        words = normalize_words(query)
+        compact = "".join(words)
+        if not compact:
+            return list(self.choices)
+        trigrams = get_trigrams(words)
+        ranked: List[Tuple[float, int, int]] = []
+        for n, shared in self._candidates(compact, trigrams).items():
+            entry = self.entries[n]
+            similarity = shared / len(trigrams)
+            score = self._score(entry, words, compact, similarity)
+            if score:
+                # shorter names first, they are closer to what was typed
+                ranked.append((-score, len(entry.compact), n))
+        ranked.sort()
+        return [self.choices[n] for _, _, n in ranked]
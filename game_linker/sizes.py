@@ -0,0 +1,119 @@
+import os
+import queue
+import stat
+import threading
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from game_linker.util import is_link_stat
+
+# listing dirs mostly waits on the drive, so more threads than cores help
+DEFAULT_SIZE_WORKERS = 8
+
+
+class DirSize(NamedTuple):
+    size: int
+    file_count: int
+
+
+class SizeScanner:
+    """Adds up the size of a dir tree, listing its dirs on several threads.
+
+    Links and junctions are not followed, e.g. a linked game in the other
+    location is not counted again, and with dedup_hardlinks a file with several
+    hardlinks in the tree is only counted once. Dirs that cannot be listed are
+    left out.
+
+    Windows does not list the link count, so finding hardlinks there takes a
+    stat of every file, which the listing threads share.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_SIZE_WORKERS,
+        dedup_hardlinks: bool = True,
+    ):
+        self.workers = workers
+        self.dedup_hardlinks = dedup_hardlinks
+        self._lock = threading.Lock()
+        self._dirs: Optional[queue.Queue] = None
+        self._inodes: Set[Tuple[int, int]] = set()
+        self._size = 0
+        self._file_count = 0
+
+    def _file_stat(self, entry: os.DirEntry) -> os.stat_result:
+        # the listing leaves st_nlink and st_ino at 0 on windows
+        if os.name == "nt":
+            return os.stat(entry.path, follow_symlinks=False)
+        return entry.stat(follow_symlinks=False)
+
+    def _scan_dir(self, path: str):
+        size = 0
+        file_count = 0
+        hardlinks = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    st = entry.stat(follow_symlinks=False)
+                    if is_link_stat(st):
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        self._dirs.put(entry.path)
+                        continue
+                    if self.dedup_hardlinks:
+                        st = self._file_stat(entry)
+                        if st.st_nlink > 1:
+                            hardlinks.append(((st.st_dev, st.st_ino), st.st_size))
+                            continue
+                    size += st.st_size
+                    file_count += 1
+        except OSError:
+            pass
+        with self._lock:
+            for inode, file_size in hardlinks:
+                if inode not in self._inodes:
+                    self._inodes.add(inode)
+                    size += file_size
+                    file_count += 1
+            self._size += size
+            self._file_count += file_count
+
+    def _work(self):
+        while True:
+            path = self._dirs.get()
+            if path is None:
+                return
+            try:
+                self._scan_dir(path)
+            finally:
+                self._dirs.task_done()
+
+    def scan(self, root: str) -> DirSize:
+        self._dirs = queue.Queue()
+        self._inodes = set()
+        self._size = 0
+        self._file_count = 0
+        self._dirs.put(root)
+        threads = [
+            threading.Thread(target=self._work, daemon=True)
+            for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        # every listed dir queues its sub dirs before it is marked done
+        self._dirs.join()
+        for _ in threads:
+            self._dirs.put(None)
+        for thread in threads:
+            thread.join()
+        return DirSize(self._size, self._file_count)
+
+
+def get_dir_size(
+    root: str,
+    workers: int = DEFAULT_SIZE_WORKERS,
+    dedup_hardlinks: bool = True,
+) -> DirSize:
+    return SizeScanner(workers, dedup_hardlinks).scan(root)
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Callable
+from typing import Optional
+
+from game_linker.util import format_size
+
+# a taker checks the rate this often while it waits, so a new rate applies quickly
+MAX_WAIT = 0.25
+
+
+class TokenBucket:
+    """Limits a rate, e.g. bytes per second, across every thread that takes from it.
+
+    The bucket holds up to a second of tokens, so short bursts are not slowed
+    down, but starts empty so a copy does not start at full speed. Taking more
+    than there is leaves the bucket in debt, and the takers wait until the debt
+    is paid off, so any amount can be taken at once. A rate of 0 does not limit
+    anything, the rate can be changed at any time, also while takers wait.
+    """
+
+    def __init__(self, rate: float = 0, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = 0.0
+        self._last = clock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: float):
+        with self._lock:
+            self._refill()
+            self._rate = rate
+            # removing the limit also forgives the debt
+            self._tokens = min(self._tokens, rate) if rate else 0.0
+
+    def _refill(self):
+        now = self._clock()
+        if self._rate:
+            self._tokens = min(
+                self._rate, self._tokens + (now - self._last) * self._rate
+            )
+        self._last = now
+
+    def reserve(self, n: float):
+        with self._lock:
+            if self._rate:
+                self._refill()
+                self._tokens -= n
+
+    def delay(self) -> float:
+        """Seconds until the debt is paid off at the current rate."""
+        with self._lock:
+            if not self._rate:
+                return 0.0
+            self._refill()
+            return -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+    def take(self, n: float):
+        self.reserve(n)
+        while True:
+            delay = self.delay()
+            if delay <= 0:
+                return
+            time.sleep(min(delay, MAX_WAIT))
+
+
+class Throttle:
+    """Limits the bytes and files a copy writes per second, shared by its threads.
+
+    The limits can be changed while copying, e.g. by the --serve process when a
+    game is started.
+    """
+
+    def __init__(self, bytes_per_second: float = 0, files_per_second: float = 0):
+        self.bytes = TokenBucket(bytes_per_second)
+        self.files = TokenBucket(files_per_second)
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.bytes.rate or self.files.rate)
+
+    def set_limits(
+        self,
+        bytes_per_second: Optional[float] = None,
+        files_per_second: Optional[float] = None,
+    ):
+        """Changes the given limits, None keeps a limit and 0 removes it."""
+        if bytes_per_second is not None:
+            self.bytes.rate = bytes_per_second
+        if files_per_second is not None:
+            self.files.rate = files_per_second
+
+    def take_bytes(self, n: int):
+        self.bytes.take(n)
+
+    def take_file(self):
+        self.files.take(1)
+
+    def describe(self) -> str:
+        """The limits, as shown next to the progress bar."""
+        limits = []
+        if self.bytes.rate:
+            limits.append(f"{format_size(self.bytes.rate)}/s")
+        if self.files.rate:
+            limits.append(f"{self.files.rate:g} files/s")
+        return f"limit {', '.join(limits)}" if limits else ""
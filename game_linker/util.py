@@ -1,17 +1,175 @@
+import errno
+import functools
+import hashlib
 import os
+import shutil
+import stat
+import subprocess
 from typing import Optional
 
-import win32api
+try:
+    import xxhash
+except ImportError:  # falls back to blake2b
+    xxhash = None
+
+
+@functools.lru_cache(maxsize=None)
+def _get_win32api():
+    # pywin32 loads its dlls on import, only pay for it once a path is fixed
+    try:
+        import win32api
+    except ImportError:  # not running on windows
+        return None
+    return win32api
 
 
 def fix_path_case(path):
+    win32api = _get_win32api()
+    if win32api is None:
+        return path
     return win32api.GetLongPathName(win32api.GetShortPathName(path))
 
 
-def walkdir(directory):
-    for dir_path, dirs, files in os.walk(directory):
-        for filename in files:
-            yield os.path.abspath(os.path.join(dir_path, filename))
+def new_hash():
+    return xxhash.xxh64() if xxhash is not None else hashlib.blake2b()
+
+
+def hash_file(path: str, buffer_size: int = 1024 * 1024) -> str:
+    file_hash = new_hash()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(buffer_size)
+            if not buf:
+                break
+            file_hash.update(buf)
+    return file_hash.hexdigest()
+
+
+def is_same_content(path1: str, path2: str) -> bool:
+    return hash_file(path1) == hash_file(path2)
+
+
+def is_link(path: str) -> bool:
+    try:
+        return is_link_stat(os.lstat(path))
+    except FileNotFoundError:
+        return False
+
+
+def is_link_stat(st: os.stat_result) -> bool:
+    # junctions are reparse points that are not reported as symlinks
+    return stat.S_ISLNK(st.st_mode) or bool(
+        getattr(st, "st_file_attributes", 0) & stat.FILE_ATTRIBUTE_REPARSE_POINT
+    )
+
+
+def read_link(path: str) -> Optional[str]:
+    """Where the link or junction points to, None if path is not a link."""
+    try:
+        target = os.readlink(path)
+    except (OSError, ValueError):
+        return None
+    if target.startswith("\\\\?\\"):
+        # junctions point to the extended path, e.g. \\?\D:\games
+        target = target[4:]
+    return os.path.normpath(os.path.join(os.path.dirname(path), target))
+
+
+def create_link(target: str, link: str):
+    """Links a game folder, with a junction on windows and a symlink elsewhere."""
+    if os.name == "nt":
+        # junctions do not need the admin rights or developer mode symlinks do
+        import _winapi
+
+        _winapi.CreateJunction(target, link)
+    else:
+        os.symlink(target, link, target_is_directory=True)
+
+
+def remove_link(path: str):
+    """Removes the link, never what it points to."""
+    if not is_link(path):
+        raise OSError(errno.EINVAL, "Not a link", path)
+    if os.name == "nt":
+        # junctions and dir symlinks are removed like empty dirs
+        os.rmdir(path)
+    else:
+        os.unlink(path)
+
+
+def format_size(size: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+def _closest_existing_path(path: str) -> str:
+    # destinations usually do not exist yet, so use their closest existing parent
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def is_same_volume(src: str, dst: str) -> bool:
+    dst = _closest_existing_path(dst)
+    if not os.path.exists(dst):
+        return False
+    return os.stat(src).st_dev == os.stat(dst).st_dev
+
+
+def get_free_space(path: str) -> int:
+    return shutil.disk_usage(_closest_existing_path(path)).free
+
+
+def ensure_free_space(path: str, size: int, reserve: int = 0):
+    free = get_free_space(path)
+    if size + reserve > free:
+        raise OSError(
+            errno.ENOSPC,
+            f"Not enough free space for {format_size(size)}, "
+            f"only {format_size(max(free - reserve, 0))} available",
+            path,
+        )
+
+
+def lower_io_priority() -> bool:
+    """Lets other programs use the disks first, e.g. a game that is playing.
+
+    Only threads started afterwards get the lower priority, so this runs before
+    anything is copied. Returns whether the priority could be lowered.
+    """
+    try:
+        # psutil is optional and slow to import, so it is only imported here
+        import psutil
+    except ImportError:  # falls back to the ionice command on linux
+        psutil = None
+    if psutil is not None:
+        # the idle class only exists on linux, very low is the windows equivalent
+        priority = getattr(psutil, "IOPRIO_CLASS_IDLE", None)
+        if priority is None:
+            priority = getattr(psutil, "IOPRIO_VERYLOW", None)
+        if priority is None:
+            return False
+        try:
+            psutil.Process().ionice(priority)
+        except (psutil.Error, OSError):
+            return False
+        return True
+    ionice = shutil.which("ionice")
+    if ionice is None:
+        return False
+    result = subprocess.run(
+        [ionice, "-c", "3", "-p", str(os.getpid())], capture_output=True
+    )
+    return result.returncode == 0
 
 
 def ask_yes_no(question: str, default: Optional[str] = None):
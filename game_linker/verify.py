@@ -0,0 +1,65 @@
+import os
+import queue
+import threading
+from typing import Optional
+
+from game_linker.util import new_hash
+
+VERIFY_FSYNC = "fsync"
+VERIFY_READBACK = "readback"
+VERIFY_MODES = [VERIFY_FSYNC, VERIFY_READBACK]
+
+_END_OF_FILE = None
+
+
+class StreamHasher:
+    """Hashes the buffers of a file on a background thread.
+
+    The copy loop hands each buffer over and keeps going, so hashing overlaps
+    with the reads and writes. One hasher can be reused for many files.
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self._buffers: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._digests: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        file_hash = new_hash()
+        while True:
+            buf = self._buffers.get()
+            if buf is _END_OF_FILE:
+                self._digests.put(file_hash.hexdigest())
+                file_hash = new_hash()
+            elif isinstance(buf, StopIteration):
+                return
+            else:
+                file_hash.update(buf)
+
+    def update(self, buf: bytes):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._buffers.put(buf)
+
+    def hexdigest(self) -> str:
+        """Waits for the buffers of the current file and returns its hash."""
+        if self._thread is None:
+            return new_hash().hexdigest()
+        self._buffers.put(_END_OF_FILE)
+        return self._digests.get()
+
+    def close(self):
+        if self._thread is not None:
+            self._buffers.put(StopIteration())
+            self._thread.join()
+            self._thread = None
+
+
+def sync_file(f):
+    """Flushes f to disk and drops it from the page cache where supported."""
+    f.flush()
+    os.fsync(f.fileno())
+    if hasattr(os, "posix_fadvise"):
+        # so reading the file back hits the disk and not the cache
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
@@ -13,6 +13,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/turkoid/game-linker",
     packages=setuptools.find_packages(),
+    entry_points={"console_scripts": ["game-linker=game_linker.cli:main"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+import yaml
+
+from game_linker import audit
+from game_linker.audit import LinkAuditor
+from game_linker.audit import repair
+from game_linker.config import GameLinkerConfig
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs symlink permission")
+
+
+@pytest.fixture
+def config(tmp_path):
+    hdd = tmp_path / "hdd"
+    ssd = tmp_path / "ssd"
+    for game in ["Linked", "Duplicated", "Orphaned", "Moved"]:
+        (ssd / game).mkdir(parents=True)
+    for game in ["Unlinked", "Duplicated", "SteamApps"]:
+        (hdd / game).mkdir(parents=True)
+    os.symlink(ssd / "Linked", hdd / "Linked")
+    os.symlink(tmp_path / "old ssd" / "Moved", hdd / "Moved")
+    os.symlink(ssd / "Deleted", hdd / "Deleted")
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        yaml.dump(
+            {
+                "steam": {
+                    "dirs": {"hdd": str(hdd), "ssd": str(ssd)},
+                    "ignore": ["SteamApps"],
+                }
+            }
+        )
+    )
+    return GameLinkerConfig(["-c", str(config_path), "--audit"])
+
+
+def _states(config):
+    return {s.name: s.state for s in LinkAuditor(config).audit(["steam"])}
+
+
+def test_games_are_classified(config):
+    assert _states(config) == {
+        "Linked": audit.LINKED,
+        "Unlinked": audit.UNLINKED,
+        "Duplicated": audit.DUPLICATED,
+        "Orphaned": audit.ORPHANED,
+        "Moved": audit.DANGLING,
+        "Deleted": audit.DANGLING,
+    }
+
+
+def test_repair_links_dangling_and_orphaned_games(config):
+    results = {
+        s.name: repair(s)
+        for s in LinkAuditor(config).audit(["steam"])
+        if s.state in audit.REPAIRABLE_STATES
+    }
+    assert results == {
+        "Moved": "linked again",
+        "Deleted": "removed the dangling link",
+        "Orphaned": "linked",
+    }
+    states = _states(config)
+    assert states["Moved"] == states["Orphaned"] == audit.LINKED
+    assert "Deleted" not in states
+
+
+def test_duplicated_games_are_not_repaired(config):
+    (duplicated,) = [
+        s for s in LinkAuditor(config).audit(["steam"]) if s.name == "Duplicated"
+    ]
+    with pytest.raises(ValueError):
+        repair(duplicated)
+
+
+def test_links_to_the_wrong_folder_are_misdirected(config, tmp_path):
+    hdd = tmp_path / "hdd"
+    ssd = tmp_path / "ssd"
+    for game in ["Misdirected", "Elsewhere"]:
+        (tmp_path / "old ssd" / game).mkdir(parents=True)
+        os.symlink(tmp_path / "old ssd" / game, hdd / game)
+    (ssd / "Misdirected").mkdir()
+    states = _states(config)
+    assert states["Misdirected"] == states["Elsewhere"] == audit.MISDIRECTED
+    assert states["Linked"] == audit.LINKED
+    results = {
+        s.name: repair(s)
+        for s in LinkAuditor(config).audit(["steam"])
+        if s.state == audit.MISDIRECTED
+    }
+    assert results["Misdirected"] == "linked again"
+    # without a copy in the target the link is the only way to the game
+    assert results["Elsewhere"].startswith("left alone")
+    states = _states(config)
+    assert states["Misdirected"] == audit.LINKED
+    assert os.path.realpath(hdd / "Misdirected") == os.path.realpath(
+        ssd / "Misdirected"
+    )
+    assert states["Elsewhere"] == audit.MISDIRECTED
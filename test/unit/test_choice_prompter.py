@@ -37,3 +37,66 @@ def test_one_choice_does_not_prompt(one_choice):
     prompter = ChoicePrompter("select", one_choice)
     choice = prompter.choose()
     assert choice == "one"
+
+
+def _answer(monkeypatch, *answers):
+    answers = iter(answers)
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+
+
+def test_lazy_choices_are_read_one_page_at_a_time(monkeypatch, capsys):
+    pulled = []
+
+    def games():
+        for n in range(1, 1000):
+            pulled.append(n)
+            yield f"game {n}"
+
+    _answer(monkeypatch, "3")
+    prompter = ChoicePrompter("select", games(), display_count=5)
+    assert prompter.choose() == "game 3"
+    assert len(pulled) == 5
+    assert ">: Next" in capsys.readouterr().out
+
+
+def test_next_page_of_lazy_choices(monkeypatch):
+    _answer(monkeypatch, ">", "7")
+    prompter = ChoicePrompter("select", (f"game {n}" for n in range(1, 9)), 5)
+    assert prompter.choose() == "game 7"
+
+
+def test_typing_filters_the_choices(monkeypatch):
+    choices = ["Doom", "Doom Eternal", "Half-Life", "Quake"]
+    _answer(monkeypatch, "doom", "eternal", "1")
+    assert ChoicePrompter("select", choices).choose() == "Doom Eternal"
+
+
+def test_filter_without_matches_keeps_the_choices(monkeypatch, capsys):
+    _answer(monkeypatch, "zelda", "2")
+    assert ChoicePrompter("select", ["Doom", "Quake"]).choose() == "Quake"
+    assert 'Nothing matches "zelda"' in capsys.readouterr().out
+
+
+def test_show_all_clears_the_filter(monkeypatch):
+    _answer(monkeypatch, "quake", "*", "1")
+    assert ChoicePrompter("select", ["Doom", "Quake"]).choose() == "Doom"
+
+
+def test_empty_lazy_choices_raise_error():
+    with pytest.raises(ValueError):
+        ChoicePrompter("select", iter([])).choose()
+
+
+def test_only_the_shown_choices_are_described(monkeypatch, capsys):
+    described = []
+
+    def describe(game):
+        described.append(game)
+        return f"{game} - 1.0 GB - hdd"
+
+    _answer(monkeypatch, "1")
+    choices = [f"game {n}" for n in range(1, 20)]
+    prompter = ChoicePrompter("select", choices, 5, describe=describe)
+    assert prompter.choose() == "game 1"
+    assert len(described) == 5
+    assert "1: game 1 - 1.0 GB - hdd" in capsys.readouterr().out
@@ -0,0 +1,67 @@
+import datetime
+import json
+import socketserver
+import threading
+
+import pytest
+
+from game_linker import client
+from game_linker.client import DaemonClient
+from game_linker.client import next_time_of_day
+
+
+def test_next_time_of_day_later_today():
+    now = datetime.datetime(2024, 5, 1, 12, 0).timestamp()
+    at = datetime.datetime.fromtimestamp(next_time_of_day(23, 30, now))
+    assert at == datetime.datetime(2024, 5, 1, 23, 30)
+
+
+def test_next_time_of_day_tomorrow():
+    now = datetime.datetime(2024, 5, 1, 12, 0).timestamp()
+    at = datetime.datetime.fromtimestamp(next_time_of_day(2, 0, now))
+    assert at == datetime.datetime(2024, 5, 2, 2, 0)
+
+
+@pytest.fixture
+def daemon(monkeypatch):
+    """A server answering a tail with some output and the finished job."""
+    requests = []
+    job = {
+        "id": 1,
+        "platform": "steam",
+        "game": "Doom",
+        "reverse": False,
+        "not_before": 0,
+        "state": "done",
+        "error": None,
+    }
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            requests.append(json.loads(self.rfile.readline()))
+            for response in [{"output": "50%\r"}, {"output": "100%\n"}, {"job": job}]:
+                self.wfile.write(f"{json.dumps(response)}\n".encode())
+
+    server = socketserver.TCPServer((client.HOST, 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield DaemonClient(server.server_address[1]), requests
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_tail_writes_the_output(daemon, capsys):
+    daemon_client, requests = daemon
+    job = daemon_client.tail(1)
+    assert requests == [{"command": "tail", "job": 1}]
+    assert job["state"] == "done"
+    assert capsys.readouterr().err == "50%\r100%\n"
+
+
+def test_not_running():
+    # nothing listens on the port once the server is closed
+    with socketserver.TCPServer((client.HOST, 0), None) as server:
+        port = server.server_address[1]
+    with pytest.raises(SystemExit, match="--serve"):
+        DaemonClient(port).jobs()
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from game_linker import config_model
+from game_linker.config_model import cache_path_for
+from game_linker.config_model import compile_config
+from game_linker.config_model import load_config
+
+CONFIG = """
+steam:
+  dirs:
+    hdd: /games/hdd/steam/
+    ssd: /games/ssd//steam
+  ignore:
+    - SteamApps
+    -
+  priority:
+    Some Game: 10
+settings:
+  workers: 2
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG)
+    return str(path)
+
+
+def test_compile_normalizes_the_config(config_path):
+    config = load_config(config_path)
+    steam = config.platforms["steam"]
+    assert steam.dirs["hdd"] == os.path.normpath("/games/hdd/steam")
+    assert steam.dirs["ssd"] == os.path.normpath("/games/ssd/steam")
+    assert steam.ignore == frozenset(["steamapps"])
+    assert steam.priority == {"some game": 10}
+    assert config.settings == {"workers": 2}
+    assert config.dir_platforms[os.path.normpath("/games/ssd/steam")] == "steam"
+
+
+def test_compiled_config_is_read_only(config_path):
+    steam = load_config(config_path).platforms["steam"]
+    with pytest.raises(AttributeError):
+        steam.name = "gog"
+    with pytest.raises(TypeError):
+        steam.dirs["hdd"] = "/elsewhere"
+
+
+def test_cache_is_used_until_the_config_changes(config_path, monkeypatch):
+    load_config(config_path)
+    assert os.path.exists(cache_path_for(config_path))
+    compiled = []
+
+    def count_compiles(raw):
+        compiled.append(raw)
+        return compile_config(raw)
+
+    monkeypatch.setattr(config_model, "compile_config", count_compiles)
+    assert load_config(config_path).platforms["steam"].ignore == {"steamapps"}
+    assert compiled == []
+
+    with open(config_path, "a") as f:
+        f.write("  buffer_size: 64\n")
+    assert load_config(config_path).settings["buffer_size"] == 64
+    assert len(compiled) == 1
@@ -0,0 +1,300 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from game_linker import copy_engine
+from game_linker.copy_engine import CopyEngine
+from game_linker.fast_copy import COPY_STRATEGIES
+from game_linker.fast_copy import sequential_copy
+from game_linker.manifest import diff_manifests
+from game_linker.manifest import Manifest
+from game_linker.throttle import Throttle
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    game = tmp_path / "src" / "game"
+    (game / "data" / "textures").mkdir(parents=True)
+    (game / "game.exe").write_bytes(b"x" * 5000)
+    (game / "data" / "level1.pak").write_bytes(b"y" * 12345)
+    (game / "data" / "textures" / "empty.dds").write_bytes(b"")
+    (game / "saves").mkdir()
+    return game
+
+
+def _tree(root):
+    tree = {}
+    for dir_path, dirs, files in os.walk(root):
+        rel = os.path.relpath(dir_path, root)
+        tree[rel] = sorted(files)
+        for filename in files:
+            with open(os.path.join(dir_path, filename), "rb") as f:
+                tree[os.path.join(rel, filename)] = f.read()
+    return tree
+
+
+def test_zero_workers_raises_error(game_dir, tmp_path):
+    with pytest.raises(ValueError):
+        _ = CopyEngine(str(game_dir), str(tmp_path / "dst"), workers=0)
+
+
+def test_copy_tree_matches_source(game_dir, tmp_path):
+    dst = tmp_path / "dst" / "game"
+    engine = CopyEngine(str(game_dir), str(dst), workers=3, buffer_size=1000)
+    assert engine.copy() == str(dst)
+    assert _tree(dst) == _tree(game_dir)
+    assert game_dir.exists()
+
+
+def test_copy_to_existing_dir_raises_error(game_dir, tmp_path):
+    dst = tmp_path / "dst"
+    dst.mkdir()
+    with pytest.raises(FileExistsError):
+        CopyEngine(str(game_dir), str(dst)).copy()
+
+
+def test_move_removes_source(game_dir, tmp_path):
+    expected = _tree(game_dir)
+    dst = tmp_path / "dst" / "game"
+    CopyEngine(str(game_dir), str(dst), workers=2).move()
+    assert not game_dir.exists()
+    assert _tree(dst) == expected
+
+
+def test_failed_copy_keeps_source(game_dir, tmp_path, monkeypatch):
+    def fail(self, *args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", fail)
+    with pytest.raises(shutil.Error):
+        CopyEngine(str(game_dir), str(tmp_path / "dst" / "game")).move()
+    assert (game_dir / "game.exe").exists()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_worker_that_dies_keeps_source(game_dir, tmp_path, monkeypatch):
+    def die(self, *args):
+        # ends the thread without an error being recorded
+        raise SystemExit
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", die)
+    with pytest.raises(shutil.Error, match="files were not copied"):
+        CopyEngine(str(game_dir), str(tmp_path / "dst" / "game"), workers=2).move()
+    assert (game_dir / "game.exe").exists()
+
+
+class FakeBar:
+    def __init__(self):
+        self.total = 0
+        self.n = 0
+
+    def update(self, n):
+        self.n += n
+
+
+def test_copy_with_manifest_entries(game_dir, tmp_path):
+    manifest = Manifest(str(game_dir)).build()
+    dst = tmp_path / "dst" / "game"
+    bar = FakeBar()
+    CopyEngine(str(game_dir), str(dst), bar, entries=manifest.entries).copy()
+    assert _tree(dst) == _tree(game_dir)
+    assert bar.n == manifest.total_size
+
+
+def test_grow_total_while_scanning(game_dir, tmp_path):
+    bar = FakeBar()
+    CopyEngine(str(game_dir), str(tmp_path / "dst"), bar, grow_total=True).copy()
+    assert bar.total == bar.n == 5000 + 12345
+
+
+def test_total_grows_ahead_of_the_copy(game_dir, tmp_path, monkeypatch):
+    for n in range(100):
+        (game_dir / "saves" / f"{n}.sav").write_bytes(b"s")
+    bar = FakeBar()
+    totals = []
+    original = CopyEngine._copy_file
+
+    def slow_copy_file(self, src, dst, entry):
+        if not totals:
+            # the job queue holds far fewer files, the scan must not wait on it
+            deadline = time.monotonic() + 5
+            while bar.total < 5000 + 12345 + 100 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            totals.append(bar.total)
+        original(self, src, dst, entry)
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", slow_copy_file)
+    CopyEngine(
+        str(game_dir),
+        str(tmp_path / "dst"),
+        bar,
+        workers=1,
+        grow_total=True,
+        small_file_size=0,
+    ).copy()
+    assert totals == [5000 + 12345 + 100]
+    assert bar.n == bar.total
+
+
+def test_sync_updates_existing_copy(game_dir, tmp_path):
+    dst = tmp_path / "dst" / "game"
+    CopyEngine(str(game_dir), str(dst)).copy()
+    (game_dir / "game.exe").write_bytes(b"patched")
+    (dst / "saves" / "old.sav").write_bytes(b"orphan")
+    diff = diff_manifests(Manifest(str(game_dir)).build(), Manifest(str(dst)).build())
+    CopyEngine(str(game_dir), str(dst)).sync(diff)
+    assert _tree(dst) == _tree(game_dir)
+
+
+@pytest.mark.parametrize("verify", ["fsync", "readback"])
+def test_verified_copy_matches_source(game_dir, tmp_path, verify):
+    dst = tmp_path / "dst" / "game"
+    engine = CopyEngine(str(game_dir), str(dst), workers=2, verify=verify)
+    engine.copy()
+    assert _tree(dst) == _tree(game_dir)
+    assert engine.bytes_copied == 5000 + 12345
+
+
+def test_readback_mismatch_keeps_source(game_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(copy_engine, "hash_file", lambda path, size: "corrupt")
+    with pytest.raises(shutil.Error):
+        CopyEngine(
+            str(game_dir), str(tmp_path / "dst" / "game"), verify="readback"
+        ).move()
+    assert (game_dir / "game.exe").exists()
+
+
+def test_failed_readback_copy_does_not_taint_the_next_hash(
+    game_dir, tmp_path, monkeypatch
+):
+    failed = []
+    original = copy_engine.fast_copy.readinto
+
+    def fail_once(fsrc, fdst, buffer, progress, on_buffer=None):
+        if not failed:
+            failed.append(fsrc.name)
+            on_buffer(b"partial")
+            raise OSError("read error")
+        original(fsrc, fdst, buffer, progress, on_buffer)
+
+    monkeypatch.setattr(copy_engine.fast_copy, "readinto", fail_once)
+    engine = CopyEngine(
+        str(game_dir),
+        str(tmp_path / "dst" / "game"),
+        workers=1,
+        verify="readback",
+        small_file_size=0,
+    )
+    with pytest.raises(shutil.Error) as e:
+        engine.copy()
+    assert [error[0] for error in e.value.args[0]] == failed
+
+
+@pytest.mark.parametrize("strategy", COPY_STRATEGIES)
+def test_copy_strategies_match_source(game_dir, tmp_path, strategy):
+    dst = tmp_path / "dst" / "game"
+    engine = CopyEngine(str(game_dir), str(dst), buffer_size=1000, strategy=strategy)
+    try:
+        engine.copy()
+    except shutil.Error as e:
+        pytest.skip(f"{strategy} not supported: {e.args[0][0][2]}")
+    assert _tree(dst) == _tree(game_dir)
+    assert engine.bytes_copied == 5000 + 12345
+
+
+@pytest.mark.parametrize("strategy", COPY_STRATEGIES)
+def test_preallocated_copies_match_source(game_dir, tmp_path, strategy):
+    dst = tmp_path / "dst" / "game"
+    engine = CopyEngine(
+        str(game_dir), str(dst), buffer_size=1000, strategy=strategy, small_file_size=1
+    )
+    try:
+        engine.copy()
+    except shutil.Error as e:
+        pytest.skip(f"{strategy} not supported: {e.args[0][0][2]}")
+    assert _tree(dst) == _tree(game_dir)
+
+
+def test_small_files_are_dropped_from_the_page_cache(game_dir, tmp_path, monkeypatch):
+    dropped = []
+    monkeypatch.setattr(
+        copy_engine.fast_copy, "drop_from_cache", lambda f: dropped.append(f.name)
+    )
+    # every file of the game is below the default small_file_size
+    CopyEngine(str(game_dir), str(tmp_path / "dst"), strategy="readinto").copy()
+    assert sorted(os.path.relpath(name, game_dir) for name in dropped) == [
+        os.path.join("data", "level1.pak"),
+        os.path.join("data", "textures", "empty.dds"),
+        "game.exe",
+    ]
+
+
+def test_preallocated_file_is_trimmed_when_source_shrinks(tmp_path):
+    src = tmp_path / "src.pak"
+    src.write_bytes(b"x" * 10000)
+    dst = tmp_path / "dst.pak"
+    with open(src, "r+b") as fsrc, open(dst, "wb") as fdst:
+        with sequential_copy(fsrc, fdst, 10000):
+            fsrc.truncate(4000)
+            fdst.write(fsrc.read())
+    assert dst.read_bytes() == b"x" * 4000
+
+
+def test_unknown_strategy_raises_error(game_dir, tmp_path):
+    with pytest.raises(ValueError):
+        _ = CopyEngine(str(game_dir), str(tmp_path / "dst"), strategy="teleport")
+
+
+@pytest.mark.parametrize("small_file_size", [0, 6000, 1024 * 1024])
+def test_small_file_batches_match_source(game_dir, tmp_path, small_file_size):
+    for n in range(100):
+        (game_dir / "saves" / f"{n}.sav").write_bytes(bytes([n]) * n)
+    dst = tmp_path / "dst" / "game"
+    engine = CopyEngine(str(game_dir), str(dst), small_file_size=small_file_size)
+    engine.copy()
+    assert _tree(dst) == _tree(game_dir)
+    small_file = os.stat(dst / "saves" / "99.sav")
+    assert small_file.st_mtime == os.stat(game_dir / "saves" / "99.sav").st_mtime
+
+
+def test_small_files_are_batched_in_inode_order(game_dir, tmp_path, monkeypatch):
+    for n in range(100):
+        (game_dir / "saves" / f"{n}.sav").write_bytes(b"s")
+    batches = []
+    original = CopyEngine._queue_batch
+
+    def record_batch(self, batch):
+        original(self, batch)
+        batches.append([entry.inode for _, _, entry in batch])
+
+    monkeypatch.setattr(CopyEngine, "_queue_batch", record_batch)
+    dst = tmp_path / "dst" / "game"
+    CopyEngine(str(game_dir), str(dst), workers=1, small_file_size=10000).copy()
+    # level1.pak is over the threshold and streamed on its own
+    assert sum(len(batch) for batch in batches) == 102
+    assert all(len(batch) <= copy_engine.BATCH_FILES for batch in batches)
+    assert all(batch == sorted(batch) for batch in batches)
+
+
+def test_throttle_takes_every_file_and_byte(game_dir, tmp_path):
+    taken = {"bytes": 0, "files": 0}
+
+    class CountingThrottle(Throttle):
+        def take_bytes(self, n: int):
+            taken["bytes"] += n
+
+        def take_file(self):
+            taken["files"] += 1
+
+    dst = tmp_path / "dst" / "game"
+    engine = CopyEngine(
+        str(game_dir),
+        str(dst),
+        strategy="readinto",
+        throttle=CountingThrottle(1024 * 1024),
+    )
+    engine.copy()
+    assert _tree(dst) == _tree(game_dir)
+    assert taken == {"bytes": 5000 + 12345, "files": 3}
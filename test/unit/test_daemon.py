@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+import yaml
+
+from game_linker.config import GameLinkerConfig
+from game_linker.daemon import JOB_DONE
+from game_linker.daemon import LinkDaemon
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs symlink permission")
+
+
+@pytest.fixture
+def library(tmp_path):
+    game = tmp_path / "library" / "hdd" / "Doom"
+    game.mkdir(parents=True)
+    (game / "doom.exe").write_bytes(b"x" * 5000)
+    (tmp_path / "library" / "ssd").mkdir()
+    (tmp_path / "outside").mkdir()
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        yaml.dump(
+            {
+                "steam": {
+                    "dirs": {
+                        "hdd": str(tmp_path / "library" / "hdd"),
+                        "ssd": str(tmp_path / "library" / "ssd"),
+                    }
+                }
+            }
+        )
+    )
+    return tmp_path
+
+
+class FakeWriter:
+    def __init__(self):
+        self.responses = []
+
+    def write(self, data: bytes):
+        self.responses.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
+def _request(library, *requests):
+    """Sends the requests to a daemon one after another, returns the responses."""
+
+    async def run():
+        daemon = LinkDaemon(GameLinkerConfig(["-c", str(library / "config.yaml")]))
+        daemon._loop = asyncio.get_running_loop()
+        responses = []
+        for request in requests:
+            writer = FakeWriter()
+            try:
+                await daemon._handle(request, writer)
+            except ValueError as e:
+                writer.responses.append({"error": str(e)})
+            responses.append(writer.responses)
+        return responses
+
+    return asyncio.run(run())
+
+
+def test_queued_link_runs_and_can_be_tailed(library):
+    queued, tailed = _request(
+        library,
+        {"command": "link", "platform": "steam", "game": "doom"},
+        {"command": "tail", "job": 1},
+    )
+    assert queued[0]["job"]["game"] == "Doom"
+    assert "output" in tailed[0]
+    assert tailed[-1]["job"]["state"] == JOB_DONE
+    assert os.path.islink(library / "library" / "hdd" / "Doom")
+
+
+@pytest.mark.parametrize(
+    "game", ["", ".", "..", "../../outside", os.path.join("Doom", ".."), "Quake"]
+)
+def test_names_outside_the_library_are_rejected(library, game):
+    (response,) = _request(
+        library, {"command": "link", "platform": "steam", "game": game}
+    )
+    assert "error" in response[0]
+    assert os.listdir(library / "library" / "ssd") == []
+    assert os.path.isdir(library / "outside")
+
+
+def test_clients_are_answered_while_a_drive_is_scanned(library, monkeypatch):
+    scanned = threading.Event()
+    get_games = GameLinkerConfig.get_games
+
+    def slow_get_games(self, platform, reverse=None):
+        # a drive that is waking up
+        scanned.wait(5)
+        return get_games(self, platform, reverse)
+
+    monkeypatch.setattr(GameLinkerConfig, "get_games", slow_get_games)
+
+    async def run():
+        daemon = LinkDaemon(GameLinkerConfig(["-c", str(library / "config.yaml")]))
+        daemon._loop = asyncio.get_running_loop()
+        link = asyncio.create_task(
+            daemon._handle(
+                {"command": "link", "platform": "steam", "game": "doom"}, FakeWriter()
+            )
+        )
+        # lets the link request start scanning
+        await asyncio.sleep(0)
+        writer = FakeWriter()
+        await daemon._handle({"command": "jobs"}, writer)
+        answered = not scanned.is_set()
+        scanned.set()
+        await link
+        return answered, writer.responses
+
+    answered, responses = asyncio.run(run())
+    assert answered
+    assert responses == [{"jobs": []}]
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from game_linker.game_index import GameIndex
+
+
+@pytest.fixture
+def hdd(tmp_path):
+    hdd = tmp_path / "hdd"
+    (hdd / "Doom").mkdir(parents=True)
+    (hdd / "Doom" / "doom.wad").write_bytes(b"x" * 300)
+    (hdd / "Quake").mkdir()
+    (hdd / "readme.txt").write_bytes(b"")
+    return hdd
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "config.index.json")
+
+
+def test_lists_only_game_dirs(hdd, index_path):
+    index = GameIndex(index_path)
+    games = index.get_games("steam", "hdd", str(hdd))
+    assert sorted(game.name for game in games) == ["Doom", "Quake"]
+
+
+def test_missing_directory_has_no_games(tmp_path, index_path):
+    index = GameIndex(index_path)
+    assert index.get_games("steam", "hdd", str(tmp_path / "missing")) == []
+
+
+def test_unchanged_directory_is_not_rescanned(hdd, index_path, monkeypatch):
+    index = GameIndex(index_path)
+    index.get_games("steam", "hdd", str(hdd))
+    index.save()
+
+    def fail(*args):
+        raise AssertionError("rescanned")
+
+    index = GameIndex(index_path)
+    monkeypatch.setattr(index, "_scan_location", fail)
+    games = index.get_games("steam", "hdd", str(hdd))
+    assert len(games) == 2
+
+
+def test_changed_directory_is_rescanned(hdd, index_path):
+    index = GameIndex(index_path)
+    index.get_games("steam", "hdd", str(hdd))
+    (hdd / "Hexen").mkdir()
+    os.utime(hdd, (0, 0))
+    games = index.get_games("steam", "hdd", str(hdd))
+    assert "Hexen" in [game.name for game in games]
+
+
+def test_size_is_computed_once_and_saved(hdd, index_path):
+    index = GameIndex(index_path)
+    game = index.get_game("steam", "hdd", str(hdd), "Doom", size=True)
+    assert (game.size, game.file_count) == (300, 1)
+    index.save()
+    game = GameIndex(index_path).get_game("steam", "hdd", str(hdd), "Doom")
+    assert game.size == 300
+
+
+def test_links_are_flagged(hdd, tmp_path, index_path):
+    ssd = tmp_path / "ssd"
+    (ssd / "Heretic").mkdir(parents=True)
+    os.symlink(ssd / "Heretic", hdd / "Heretic")
+    games = GameIndex(index_path).get_games("steam", "hdd", str(hdd))
+    linked = {game.name: game.linked for game in games}
+    assert linked == {"Doom": False, "Quake": False, "Heretic": True}
@@ -0,0 +1,118 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+
+import pytest
+
+from game_linker import instrument
+from game_linker.copy_engine import CopyEngine
+from game_linker.instrument import Metrics
+from game_linker.instrument import Profiler
+from game_linker.instrument import SLOWEST_FILES
+
+
+@pytest.fixture
+def metrics():
+    return Metrics()
+
+
+def test_nothing_is_recorded_until_started(metrics):
+    with metrics.phase("copy_files"):
+        pass
+    metrics.add("dirs")
+    metrics.add_file("game.exe", 10, 1.0)
+    assert metrics.phases == {}
+    assert metrics.counters == {}
+
+
+def test_report_has_phases_counters_and_slowest_files(metrics, tmp_path):
+    report_path = tmp_path / "report.json"
+    metrics.start(str(report_path))
+    for _ in range(2):
+        with metrics.phase("copy_files"):
+            pass
+    metrics.add("dirs", 3)
+    for n in range(SLOWEST_FILES + 5):
+        metrics.add_file(f"{n}.pak", 4 * 1024 * 1024, float(n + 1))
+    metrics.stop()
+    report = json.loads(report_path.read_text())
+    assert report["phases"]["copy_files"]["count"] == 2
+    assert report["counters"] == {
+        "dirs": 3,
+        "files": SLOWEST_FILES + 5,
+        "bytes": (SLOWEST_FILES + 5) * 4 * 1024 * 1024,
+    }
+    slowest = [f["path"] for f in report["slowest_files"]]
+    assert slowest == [f"{n}.pak" for n in range(SLOWEST_FILES + 4, 4, -1)]
+    # 4 MiB in 1, 2, 3 and 4 seconds, anything slower is under 1 MiB/s
+    histogram = report["throughput_mib_per_second"]
+    assert histogram["4-8"] == 1
+    assert histogram["2-4"] == 1
+    assert histogram["1-2"] == 2
+    assert histogram["0-1"] == SLOWEST_FILES + 1
+
+
+def test_jsonl_log_has_a_line_per_event(metrics, tmp_path):
+    log_path = tmp_path / "report.jsonl"
+    metrics.start(str(log_path))
+    with metrics.phase("build_bar"):
+        pass
+    with metrics.phase("copy_data", log=False):
+        pass
+    metrics.add_file("game.exe", 10, 0.5)
+    metrics.stop()
+    events = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [event["event"] for event in events] == ["phase", "file", "report"]
+    assert events[2]["phases"]["copy_data"]["count"] == 1
+
+
+def _copy_on_a_worker_thread():
+    return sum(range(1000))
+
+
+def test_profile_includes_worker_threads(tmp_path):
+    profile_path = tmp_path / "run.prof"
+    profiler = Profiler(str(profile_path))
+    profiler.start()
+    thread = threading.Thread(target=_copy_on_a_worker_thread)
+    thread.start()
+    thread.join()
+    profiler.stop()
+    functions = {name for _, _, name in pstats.Stats(str(profile_path)).stats}
+    assert "_copy_on_a_worker_thread" in functions
+    # Thread.start and join ran on the main thread
+    assert {"start", "join"} <= functions
+
+
+class _ProfileOnlyOnMainThread(cProfile.Profile):
+    # like python 3.12, where only one profile can be enabled at a time
+    def enable(self, *args, **kwargs):
+        if threading.current_thread() is not threading.main_thread():
+            raise ValueError("Another profiling tool is already active")
+        super().enable(*args, **kwargs)
+
+
+@pytest.mark.parametrize("thread_profiles_fail", [False, True])
+def test_move_under_the_profiler_copies_every_file(
+    tmp_path, monkeypatch, thread_profiles_fail
+):
+    if thread_profiles_fail:
+        monkeypatch.setattr(cProfile, "Profile", _ProfileOnlyOnMainThread)
+    src = tmp_path / "src" / "game"
+    (src / "data").mkdir(parents=True)
+    for n in range(20):
+        (src / "data" / f"{n}.pak").write_bytes(b"x" * 1000 * n)
+    dst = tmp_path / "dst" / "game"
+    profile_path = tmp_path / "run.prof"
+    instrument.start(profile_path=str(profile_path))
+    try:
+        CopyEngine(str(src), str(dst), workers=4).move()
+    finally:
+        instrument.stop()
+    assert not src.exists()
+    assert sorted(os.listdir(dst / "data")) == sorted(f"{n}.pak" for n in range(20))
+    assert (dst / "data" / "19.pak").read_bytes() == b"x" * 19000
+    functions = {name for _, _, name in pstats.Stats(str(profile_path)).stats}
+    assert "move" in functions
@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+
+from game_linker import journal as journal_module
+from game_linker.copy_engine import CopyEngine
+from game_linker.journal import Journal
+from game_linker.manifest import Manifest
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    game = tmp_path / "hdd" / "game"
+    (game / "data").mkdir(parents=True)
+    for n in range(5):
+        (game / "data" / f"{n}.pak").write_bytes(bytes([n]) * 1000)
+    return game
+
+
+def test_journal_is_removed_after_move(game_dir, tmp_path):
+    dst = tmp_path / "ssd" / "game"
+    journal = Journal.for_move(str(game_dir), str(dst))
+    CopyEngine(str(game_dir), str(dst), journal=journal).move()
+    assert not os.path.exists(journal.path)
+    assert len(os.listdir(dst / "data")) == 5
+
+
+def test_journal_from_other_source_is_not_resumed(game_dir, tmp_path):
+    dst = tmp_path / "game"
+    Journal.for_move(str(tmp_path / "other"), str(dst)).open(resume=False)
+    assert not Journal.for_move(str(game_dir), str(dst)).load()
+
+
+def test_interrupted_move_resumes(game_dir, tmp_path, monkeypatch):
+    dst = tmp_path / "ssd" / "game"
+    copied = []
+    original = CopyEngine._copy_file
+
+    def copy_three(self, src, dst, entry):
+        if len(copied) == 3:
+            raise OSError("power loss")
+        original(self, src, dst, entry)
+        copied.append(entry.path)
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", copy_three)
+    journal = Journal.for_move(str(game_dir), str(dst))
+    with pytest.raises(shutil.Error):
+        CopyEngine(str(game_dir), str(dst), workers=1, journal=journal).move()
+    assert os.path.exists(journal.path)
+    assert game_dir.exists()
+
+    def copy_rest(self, src, dst, entry):
+        assert entry.path not in copied
+        original(self, src, dst, entry)
+        copied.append(entry.path)
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", copy_rest)
+    journal = Journal.for_move(str(game_dir), str(dst))
+    CopyEngine(str(game_dir), str(dst), workers=1, journal=journal).move()
+    assert sorted(copied) == sorted(
+        entry.path for entry in Manifest(str(dst)).build().files
+    )
+    assert not game_dir.exists()
+    assert not os.path.exists(journal.path)
+
+
+def test_files_are_synced_before_they_are_recorded(game_dir, tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        synced.append("journal")
+        real_fsync(fd)
+
+    monkeypatch.setattr(
+        journal_module, "_sync_path", lambda path: synced.append("file")
+    )
+    monkeypatch.setattr(os, "fsync", fsync)
+    monkeypatch.setattr(journal_module, "SYNC_FILES", 2)
+    dst = tmp_path / "ssd" / "game"
+    journal = Journal.for_move(str(game_dir), str(dst))
+    CopyEngine(str(game_dir), str(dst), workers=1, journal=journal).copy()
+    assert synced == ["file", "file", "journal"] * 2 + ["file", "journal"]
+    journal = Journal.for_move(str(game_dir), str(dst))
+    assert journal.load()
+    for entry in Manifest(str(game_dir)).build().files:
+        assert journal.is_done(entry, str(dst / entry.path))
@@ -0,0 +1,215 @@
+import errno
+import os
+import shutil
+import threading
+
+import pytest
+import yaml
+
+from game_linker import game_index
+from game_linker import linker as linker_module
+from game_linker import util
+from game_linker.config import GameLinkerConfig
+from game_linker.copy_engine import CopyEngine
+from game_linker.linker import GameLinker
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs symlink permission")
+
+
+@pytest.fixture
+def library(tmp_path):
+    for game in ["Doom", "Quake"]:
+        game_dir = tmp_path / "hdd" / game
+        (game_dir / "data").mkdir(parents=True)
+        (game_dir / f"{game}.exe").write_bytes(b"x" * 5000)
+        (game_dir / "data" / "level1.pak").write_bytes(game.encode() * 1000)
+    (tmp_path / "ssd").mkdir()
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        yaml.dump(
+            {
+                "steam": {
+                    "dirs": {
+                        "hdd": str(tmp_path / "hdd"),
+                        "ssd": str(tmp_path / "ssd"),
+                    }
+                }
+            }
+        )
+    )
+    return tmp_path
+
+
+def _config(library, *args):
+    return GameLinkerConfig(["-c", str(library / "config.yaml"), "-p", "steam", *args])
+
+
+def _linker(config, game, reverse=None):
+    linker = GameLinker(config, game=game, reverse=reverse)
+    linker.fix_paths()
+    return linker
+
+
+def _tree(root):
+    tree = {}
+    for dir_path, dirs, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(dir_path, filename)
+            with open(path, "rb") as f:
+                tree[os.path.relpath(path, root)] = f.read()
+    return tree
+
+
+def test_link_renames_within_a_volume(library, monkeypatch):
+    def copy(*args, **kwargs):
+        raise AssertionError("a move within one volume must not copy")
+
+    monkeypatch.setattr(linker_module.CopyProgress, "move", copy)
+    expected = _tree(library / "hdd" / "Doom")
+    _linker(_config(library), "Doom").execute()
+    assert os.path.islink(library / "hdd" / "Doom")
+    assert _tree(library / "ssd" / "Doom") == expected
+
+
+def test_batch_links_every_game_and_reports_failures(library, monkeypatch, capsys):
+    monkeypatch.setattr(linker_module, "is_same_volume", lambda src, dst: False)
+    monkeypatch.setattr(linker_module, "ask_yes_no", lambda *args, **kwargs: True)
+    # a file in the way of the move makes Quake fail
+    (library / "ssd" / "Quake").write_bytes(b"")
+    expected = _tree(library / "hdd" / "Doom")
+    linker_module.link_batch(_config(library, "--batch", "*"))
+    out = capsys.readouterr().out
+    assert "[steam] Quake: failed (Game folder exists in both locations)" in out
+    assert "1 moved, 1 failed" in out
+    assert os.path.islink(library / "hdd" / "Doom")
+    assert _tree(library / "ssd" / "Doom") == expected
+    assert not os.path.islink(library / "hdd" / "Quake")
+
+
+def test_sync_updates_the_old_copy_and_links_it(library, monkeypatch):
+    monkeypatch.setattr(linker_module, "is_same_volume", lambda src, dst: False)
+    expected = _tree(library / "hdd" / "Doom")
+    old_copy = library / "ssd" / "Doom"
+    (old_copy / "data").mkdir(parents=True)
+    (old_copy / "Doom.exe").write_bytes(b"x" * 5000)
+    (old_copy / "data" / "level1.pak").write_bytes(b"old")
+    (old_copy / "data" / "removed.pak").write_bytes(b"gone")
+    _linker(_config(library, "--sync"), "Doom").execute()
+    assert os.path.islink(library / "hdd" / "Doom")
+    assert _tree(old_copy) == expected
+
+
+def test_sync_reverse_keeps_the_copy_in_the_target(library, monkeypatch):
+    monkeypatch.setattr(linker_module, "is_same_volume", lambda src, dst: False)
+    expected = _tree(library / "hdd" / "Doom")
+    _linker(_config(library), "Doom").execute()
+    _linker(_config(library, "--sync", "-r"), "Doom").execute()
+    assert not os.path.islink(library / "hdd" / "Doom")
+    assert _tree(library / "hdd" / "Doom") == expected
+    assert _tree(library / "ssd" / "Doom") == expected
+
+
+def test_interrupted_move_resumes(library, monkeypatch):
+    monkeypatch.setattr(linker_module, "is_same_volume", lambda src, dst: False)
+    expected = _tree(library / "hdd" / "Doom")
+    copied = []
+    original = CopyEngine._copy_file
+
+    def copy_one(self, src, dst, entry):
+        if copied:
+            raise OSError("power loss")
+        original(self, src, dst, entry)
+        copied.append(entry.path)
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", copy_one)
+    with pytest.raises(shutil.Error):
+        _linker(_config(library, "-w", "1"), "Doom").execute()
+    assert _tree(library / "hdd" / "Doom") == expected
+
+    def copy_rest(self, src, dst, entry):
+        assert entry.path not in copied
+        original(self, src, dst, entry)
+        copied.append(entry.path)
+
+    monkeypatch.setattr(CopyEngine, "_copy_file", copy_rest)
+    _linker(_config(library, "-w", "1"), "Doom").execute()
+    assert sorted(copied) == sorted(expected)
+    assert os.path.islink(library / "hdd" / "Doom")
+    assert _tree(library / "ssd" / "Doom") == expected
+    # the journal is gone
+    assert os.listdir(library / "ssd") == ["Doom"]
+
+
+@pytest.mark.parametrize("stream_scan", [[], ["--stream-scan"]])
+def test_free_space_is_checked_against_the_real_size(library, monkeypatch, stream_scan):
+    monkeypatch.setattr(linker_module, "is_same_volume", lambda src, dst: False)
+    config = _config(library)
+    cached_size = config.get_game_size("steam", "hdd", "Doom")
+    # grows the game without touching the mtime the index checks
+    (library / "hdd" / "Doom" / "data" / "level2.pak").write_bytes(b"z" * 100000)
+    monkeypatch.setattr(util, "get_free_space", lambda path: cached_size + 1000)
+    linker = _linker(_config(library, "-w", "1", *stream_scan), "Doom")
+    assert linker._get_cached_size(linker.source_path) == cached_size
+    with pytest.raises(OSError) as e:
+        linker.execute()
+    assert e.value.errno == errno.ENOSPC
+    assert not os.path.islink(library / "hdd" / "Doom")
+    assert os.path.exists(library / "hdd" / "Doom" / "data" / "level2.pak")
+
+
+def test_prompt_does_not_wait_for_sizes(library, monkeypatch):
+    sized = threading.Event()
+    get_dir_size = game_index.get_dir_size
+
+    def slow_get_dir_size(path):
+        sized.wait(5)
+        return get_dir_size(path)
+
+    monkeypatch.setattr(game_index, "get_dir_size", slow_get_dir_size)
+    config = _config(library)
+    config.get_games("steam")
+    assert config.describe_game("steam", "Doom") == "Doom - size unknown - hdd"
+    sized.set()
+    config._unsized.join()
+    assert config.describe_game("steam", "Doom") == "Doom - 8.8 KB - hdd"
+
+
+def test_prompt_does_not_touch_locations_it_did_not_scan(library, monkeypatch):
+    shutil.copytree(library / "hdd" / "Doom", library / "ssd" / "Doom")
+    _config(library).get_games("steam")
+    touched = []
+    get_location = game_index.GameIndex._get_location
+
+    def record_get_location(self, platform, location, directory):
+        touched.append(location)
+        return get_location(self, platform, location, directory)
+
+    monkeypatch.setattr(game_index.GameIndex, "_get_location", record_get_location)
+    # reverse only scans the target, the source drive may be asleep
+    config = _config(library, "-r")
+    config.get_games("steam")
+    assert config.describe_game("steam", "Doom") == "Doom - size unknown - hdd/ssd"
+    config._unsized.join()
+    assert touched == ["ssd", "ssd"]
+
+
+def test_all_games_keep_the_order_of_platforms(library, monkeypatch):
+    config_path = library / "config.yaml"
+    dirs = yaml.safe_load(config_path.read_text())["steam"]["dirs"]
+    config_path.write_text(yaml.dump({"gog": {"dirs": dirs}, "steam": {"dirs": dirs}}))
+    config = _config(library)
+    steam_done = threading.Event()
+    original = GameLinkerConfig.get_games_for_platform
+
+    def gog_waits_for_steam(self, platform, location):
+        if platform == "gog":
+            steam_done.wait(5)
+        games = original(self, platform, location)
+        if platform == "steam" and location == "hdd":
+            steam_done.set()
+        return games
+
+    monkeypatch.setattr(GameLinkerConfig, "get_games_for_platform", gog_waits_for_steam)
+    platforms = [platform for platform, _ in config.iter_all_games(["gog", "steam"])]
+    assert steam_done.is_set()
+    assert platforms == ["gog", "steam"]
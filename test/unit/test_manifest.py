@@ -0,0 +1,66 @@
+import os
+import shutil
+
+import pytest
+
+from game_linker.manifest import diff_manifests
+from game_linker.manifest import Manifest
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    game = tmp_path / "game"
+    (game / "data" / "textures").mkdir(parents=True)
+    (game / "game.exe").write_bytes(b"x" * 100)
+    (game / "data" / "level1.pak").write_bytes(b"y" * 250)
+    (game / "data" / "textures" / "sky.dds").write_bytes(b"z" * 50)
+    return game
+
+
+def test_build_counts_files_and_size(game_dir):
+    manifest = Manifest(str(game_dir)).build()
+    assert manifest.total_size == 400
+    assert manifest.file_count == 3
+    assert len(manifest.files) == 3
+
+
+def test_dirs_listed_before_their_contents(game_dir):
+    manifest = Manifest(str(game_dir)).build()
+    seen_dirs = {""}
+    for entry in manifest.entries:
+        assert os.path.dirname(entry.path) in seen_dirs
+        if entry.is_dir:
+            seen_dirs.add(entry.path)
+
+
+def test_scan_is_lazy(game_dir):
+    manifest = Manifest(str(game_dir))
+    entries = manifest.scan()
+    assert manifest.entries == []
+    next(entries)
+    assert len(manifest.entries) == 1
+
+
+def test_diff_finds_changed_and_orphaned_files(game_dir, tmp_path):
+    copy = tmp_path / "copy"
+    shutil.copytree(game_dir, copy)
+    (game_dir / "data" / "level1.pak").write_bytes(b"patched")
+    (copy / "old.log").write_bytes(b"log")
+    diff = diff_manifests(Manifest(str(game_dir)).build(), Manifest(str(copy)).build())
+    changed_files = [entry.path for entry in diff.changed if not entry.is_dir]
+    assert changed_files == [os.path.join("data", "level1.pak")]
+    assert [entry.path for entry in diff.orphans] == ["old.log"]
+    assert diff.changed_size == 7
+    assert diff.unchanged_size == 150
+
+
+def test_diff_compares_content_when_asked(game_dir, tmp_path):
+    copy = tmp_path / "copy"
+    shutil.copytree(game_dir, copy)
+    diff = diff_manifests(
+        Manifest(str(game_dir)).build(),
+        Manifest(str(copy)).build(),
+        same_content=lambda src, dst: not src.endswith("game.exe"),
+    )
+    changed_files = [entry.path for entry in diff.changed if not entry.is_dir]
+    assert changed_files == ["game.exe"]
@@ -0,0 +1,56 @@
+from game_linker.planner import plan_tier
+from game_linker.planner import TierCandidate
+
+
+def _candidate(name, size, linked=False, priority=0, last_played=0.0):
+    return TierCandidate("steam", name, size, linked, priority, last_played)
+
+
+def _names(candidates):
+    return [c.name for c in candidates]
+
+
+def test_recently_played_games_are_linked_first():
+    plan = plan_tier(
+        [
+            _candidate("old", 60, last_played=1.0),
+            _candidate("new", 60, last_played=2.0),
+        ],
+        100,
+        [],
+    )
+    assert _names(plan.links) == ["new"]
+    assert plan.used == 60
+
+
+def test_priority_beats_last_played():
+    plan = plan_tier(
+        [
+            _candidate("played", 60, linked=True, last_played=2.0),
+            _candidate("favourite", 60, priority=1),
+        ],
+        100,
+        [],
+    )
+    assert _names(plan.links) == ["favourite"]
+    assert _names(plan.unlinks) == ["played"]
+
+
+def test_smaller_games_fill_the_remaining_budget():
+    plan = plan_tier(
+        [
+            _candidate("big", 80, last_played=3.0),
+            _candidate("huge", 50, last_played=2.0),
+            _candidate("small", 20, linked=True, last_played=1.0),
+        ],
+        100,
+        [],
+    )
+    assert _names(plan.links) == ["big"]
+    assert _names(plan.keeps) == ["small"]
+    assert plan.unlinks == []
+
+
+def test_negative_priority_is_never_linked():
+    plan = plan_tier([_candidate("never", 1, linked=True, priority=-1)], 100, [])
+    assert _names(plan.unlinks) == ["never"]
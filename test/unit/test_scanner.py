@@ -0,0 +1,31 @@
+import threading
+
+from game_linker.scanner import iter_concurrently
+from game_linker.scanner import run_concurrently
+
+
+def test_results_and_errors_are_split():
+    def fail():
+        raise OSError("drive not ready")
+
+    results, errors = run_concurrently({"ok": lambda: [1, 2], "bad": fail})
+    assert results == {"ok": [1, 2]}
+    assert errors == {"bad": "drive not ready"}
+
+
+def test_slow_job_is_dropped_after_timeout():
+    asleep = threading.Event()
+    results, errors = run_concurrently(
+        {"fast": lambda: "done", "asleep": asleep.wait}, timeout=0.1
+    )
+    asleep.set()
+    assert results == {"fast": "done"}
+    assert "asleep" in errors
+
+
+def test_results_are_yielded_as_jobs_finish():
+    slow = threading.Event()
+    outcomes = iter_concurrently({"slow": slow.wait, "fast": lambda: "done"})
+    assert next(outcomes) == ("fast", "done", None)
+    slow.set()
+    assert next(outcomes) == ("slow", True, None)
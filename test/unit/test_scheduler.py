@@ -0,0 +1,34 @@
+import sys
+
+from game_linker.scheduler import MoveJob
+from game_linker.scheduler import MoveScheduler
+
+
+def test_jobs_on_one_drive_share_a_lane(tmp_path):
+    scheduler = MoveScheduler()
+    for name in ["a", "b", "c"]:
+        scheduler.add(MoveJob(name, lambda: None, str(tmp_path), 0))
+    assert len(scheduler.lanes) == 1
+
+
+def test_jobs_on_one_drive_run_in_order(tmp_path):
+    ran = []
+    scheduler = MoveScheduler()
+    for name in ["a", "b", "c"]:
+        scheduler.add(MoveJob(name, lambda n=name: ran.append(n), str(tmp_path), 1))
+    results = scheduler.run()
+    assert ran == ["a", "b", "c"]
+    assert [result.name for result in results] == ["a", "b", "c"]
+
+
+def test_failed_jobs_are_reported(tmp_path):
+    def fail():
+        sys.exit("Game folder exists in both locations")
+
+    scheduler = MoveScheduler()
+    scheduler.add(MoveJob("ok", lambda: None, str(tmp_path), 10))
+    scheduler.add(MoveJob("bad", fail, str(tmp_path), 10))
+    ok, bad = scheduler.run()
+    assert ok.error is None and ok.size == 10
+    assert bad.error == "Game folder exists in both locations"
+    assert bad.size == 0
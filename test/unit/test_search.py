@@ -0,0 +1,59 @@
+import pytest
+
+from game_linker.search import GameSearch
+from game_linker.search import normalize_words
+
+
+@pytest.fixture
+def search():
+    return GameSearch(
+        [
+            "DOOM Eternal",
+            "DOOM",
+            "Final Fantasy VII Remake",
+            "Half-Life 2",
+            "Pokémon Legends",
+            "Red Dead Redemption",
+            "Red Dead Redemption 2",
+            "The Witcher 3: Wild Hunt",
+        ]
+    )
+
+
+def test_normalize_words():
+    assert normalize_words("Pokémon: Let's Go!") == ["pokemon", "let", "s", "go"]
+    assert normalize_words("Final Fantasy VII") == ["final", "fantasy", "7"]
+
+
+@pytest.mark.parametrize(
+    "query, best",
+    [
+        ("doom", "DOOM"),
+        ("rdr2", "Red Dead Redemption 2"),
+        ("ff7", "Final Fantasy VII Remake"),
+        ("halflife", "Half-Life 2"),
+        ("pokemon", "Pokémon Legends"),
+        ("witcher 3", "The Witcher 3: Wild Hunt"),
+        ("redemtion", "Red Dead Redemption"),
+    ],
+)
+def test_best_match_is_first(search, query, best):
+    assert search.search(query)[0] == best
+
+
+def test_exact_match_ranks_above_prefix(search):
+    assert search.search("doom") == ["DOOM", "DOOM Eternal"]
+
+
+def test_unrelated_names_are_left_out(search):
+    assert search.search("zelda") == []
+
+
+def test_empty_query_returns_every_choice(search):
+    assert search.search("") == search.choices
+
+
+def test_search_by_key():
+    games = [("steam", "Portal 2"), ("gog", "Portal")]
+    search = GameSearch(games, key=lambda game: game[1])
+    assert search.search("portal") == [("gog", "Portal"), ("steam", "Portal 2")]
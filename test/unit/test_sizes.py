@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from game_linker.sizes import get_dir_size
+
+
+@pytest.fixture
+def game(tmp_path):
+    game = tmp_path / "hdd" / "game"
+    for n in range(20):
+        sub_dir = game / f"{n % 4}" / f"{n % 3}"
+        sub_dir.mkdir(parents=True, exist_ok=True)
+        (sub_dir / f"{n}.bin").write_bytes(b"x" * n)
+    return game
+
+
+def test_size_of_every_file(game):
+    size = get_dir_size(str(game), workers=3)
+    assert size == (sum(range(20)), 20)
+
+
+def test_hardlinks_are_counted_once(game):
+    (game / "big.pak").write_bytes(b"y" * 1000)
+    os.link(game / "big.pak", game / "0" / "big.pak")
+    # on every system, even where the listing has no link count
+    assert get_dir_size(str(game)) == (sum(range(20)) + 1000, 21)
+
+
+def test_hardlinks_without_dedup_are_counted_each_time(game):
+    (game / "big.pak").write_bytes(b"y" * 1000)
+    os.link(game / "big.pak", game / "0" / "big.pak")
+    assert get_dir_size(str(game), dedup_hardlinks=False) == (
+        sum(range(20)) + 2000,
+        22,
+    )
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs symlink permission")
+def test_links_are_not_followed(game, tmp_path):
+    other = tmp_path / "ssd" / "other"
+    other.mkdir(parents=True)
+    (other / "data.bin").write_bytes(b"z" * 500)
+    os.symlink(other, game / "linked")
+    os.symlink(other / "data.bin", game / "data.bin")
+    assert get_dir_size(str(game)) == (sum(range(20)), 20)
+
+
+def test_missing_dir_is_empty(tmp_path):
+    assert get_dir_size(str(tmp_path / "missing")) == (0, 0)
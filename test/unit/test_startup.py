@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+# modules that are slow to import and only needed once a copy starts or the
+# config changed
+DEFERRED_MODULES = ["tqdm", "yaml", "cProfile", "win32api"]
+# cumulative import time of the cli in microseconds, generous for slow machines
+STARTUP_BUDGET = 500_000
+
+
+def import_times() -> dict:
+    """The cumulative import time of every module the cli imports."""
+    root = os.path.join(os.path.dirname(__file__), "..", "..")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import game_linker.cli"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_defers_heavy_imports():
+    times = import_times()
+    assert "game_linker.cli" in times
+    for module in DEFERRED_MODULES:
+        assert module not in times
+    assert times["game_linker.cli"] < STARTUP_BUDGET
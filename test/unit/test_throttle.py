@@ -0,0 +1,78 @@
+import pytest
+
+from game_linker.copy_progress import CopyProgress
+from game_linker.throttle import Throttle
+from game_linker.throttle import TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_debt_is_paid_off_at_the_rate():
+    clock = Clock()
+    bucket = TokenBucket(100, clock)
+    bucket.reserve(250)
+    assert bucket.delay() == 2.5
+    clock.now = 2.0
+    assert bucket.delay() == 0.5
+    clock.now = 3.0
+    assert bucket.delay() == 0
+
+
+def test_bucket_holds_at_most_a_second():
+    clock = Clock()
+    bucket = TokenBucket(100, clock)
+    clock.now = 60
+    bucket.reserve(150)
+    assert bucket.delay() == 0.5
+
+
+def test_changing_the_rate_applies_to_waiting_takers():
+    clock = Clock()
+    bucket = TokenBucket(100, clock)
+    bucket.reserve(200)
+    bucket.rate = 400
+    assert bucket.delay() == 0.5
+    bucket.rate = 0
+    assert bucket.delay() == 0
+    bucket.take(10**9)
+
+
+def test_describe():
+    throttle = Throttle()
+    assert not throttle.limited
+    assert throttle.describe() == ""
+    throttle.set_limits(bytes_per_second=20 * 1024 * 1024)
+    throttle.set_limits(files_per_second=50)
+    assert throttle.limited
+    assert throttle.describe() == "limit 20.0 MB/s, 50 files/s"
+
+
+class CountingThrottle(Throttle):
+    def __init__(self):
+        super().__init__(1024 * 1024)
+        self.bytes_taken = 0
+        self.files_taken = 0
+
+    def take_bytes(self, n: int):
+        self.bytes_taken += n
+
+    def take_file(self):
+        self.files_taken += 1
+
+
+@pytest.mark.parametrize("copy", [CopyProgress.copy, CopyProgress.move])
+def test_copies_without_workers_are_throttled(tmp_path, copy):
+    src = tmp_path / "hdd" / "game"
+    src.mkdir(parents=True)
+    (src / "game.exe").write_bytes(b"x" * 5000)
+    (src / "level1.pak").write_bytes(b"y" * 3000)
+    throttle = CountingThrottle()
+    copy(str(src), str(tmp_path / "ssd" / "game"), workers=0, throttle=throttle)
+    assert throttle.files_taken == 2
+    assert throttle.bytes_taken == 8000
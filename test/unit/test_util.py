@@ -0,0 +1,35 @@
+import os
+
+from game_linker.util import is_same_volume
+
+
+def test_same_volume_with_missing_dst(tmp_path):
+    src = tmp_path / "hdd" / "game"
+    src.mkdir(parents=True)
+    assert is_same_volume(str(src), str(tmp_path / "ssd" / "game"))
+
+
+def test_same_volume_with_existing_dst(tmp_path):
+    src = tmp_path / "game.exe"
+    src.write_bytes(b"")
+    assert is_same_volume(str(src), str(tmp_path))
+
+
+def test_different_volume(tmp_path, monkeypatch):
+    src = tmp_path / "hdd" / "game"
+    src.mkdir(parents=True)
+    ssd = tmp_path / "ssd"
+    ssd.mkdir()
+    real_stat = os.stat
+
+    def stat(path, *args, **kwargs):
+        st = real_stat(path, *args, **kwargs)
+        if os.path.normpath(path) != os.path.normpath(ssd):
+            return st
+        values = list(st[:10])
+        # st_dev, as if ssd was another drive
+        values[2] += 1
+        return os.stat_result(values)
+
+    monkeypatch.setattr(os, "stat", stat)
+    assert not is_same_volume(str(src), str(ssd / "game"))
@@ -0,0 +1,23 @@
+from game_linker.util import new_hash
+from game_linker.verify import StreamHasher
+
+
+def _hash(data):
+    file_hash = new_hash()
+    file_hash.update(data)
+    return file_hash.hexdigest()
+
+
+def test_hasher_is_reused_across_files():
+    hasher = StreamHasher()
+    hasher.update(b"abc")
+    hasher.update(b"def")
+    assert hasher.hexdigest() == _hash(b"abcdef")
+    hasher.update(b"xyz")
+    assert hasher.hexdigest() == _hash(b"xyz")
+    hasher.close()
+
+
+def test_empty_file_hash():
+    hasher = StreamHasher()
+    assert hasher.hexdigest() == _hash(b"")